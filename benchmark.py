@@ -0,0 +1,315 @@
+#!/usr/bin/env python
+"""
+Benchmarks searching and replacing synthetic Cat / Dog data of different sizes.
+
+    ./benchmark.py --sizes 10000 100000 1000000 --output results.json
+    ./benchmark.py --postgres benchmark --view-option database_replace=true
+    ./benchmark.py --postgres benchmark --indexes
+    ./benchmark.py --search-index
+
+Every phase records the wall time, the number of queries and the peak memory allocated
+by Python, so the JSON output can be compared between versions. Queries run by worker
+threads (max_workers > 1) are not counted.
+"""
+
+import argparse
+import json
+import os
+import platform
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+import uuid
+
+import django
+from django.conf import settings
+
+SEARCH = "needle"
+REPLACE = "thread"
+WORDS = (
+    "lorem ipsum dolor sit amet consectetur adipiscing elit sed do eiusmod tempor "
+    "incididunt ut labore et dolore magna aliqua"
+).split()
+
+
+def configure(database):
+    settings.configure(
+        DEBUG=False,
+        SECRET_KEY="benchmark",
+        DATABASES={"default": database},
+        MIGRATION_MODULES={
+            "search_and_replace": None,
+            "auth": None,
+            "admin": None,
+            "contenttypes": None,
+            "sessions": None,
+            "messages": None,
+        },
+        INSTALLED_APPS=(
+            "django.contrib.contenttypes",
+            "django.contrib.auth",
+            "django.contrib.admin",
+            "django.contrib.sessions",
+            "django.contrib.messages",
+            "search_and_replace",
+        ),
+        ROOT_URLCONF="search_and_replace.tests",
+        TEMPLATES=[
+            {
+                "BACKEND": "django.template.backends.django.DjangoTemplates",
+                "DIRS": [],
+                "APP_DIRS": True,
+                "OPTIONS": {
+                    "context_processors": [
+                        "django.contrib.auth.context_processors.auth",
+                        "django.contrib.messages.context_processors.messages",
+                    ]
+                },
+            }
+        ],
+    )
+    django.setup()
+
+
+def make_text(rng, size, match):
+    words = []
+    length = 0
+    while length < size:
+        word = rng.choice(WORDS)
+        words.append(word)
+        length += len(word) + 1
+    if match:
+        words.insert(rng.randrange(len(words)), SEARCH)
+    return " ".join(words)
+
+
+def load_data(size, text_size, match_rate, seed=0, batch_size=10000):
+    from django.db import connection
+
+    from search_and_replace.tests import Cat, Dog
+
+    # without sending post_delete for every row, the index is rebuilt after loading
+    with connection.cursor() as cursor:
+        for model in (Cat, Dog):
+            cursor.execute(
+                "DELETE FROM {}".format(connection.ops.quote_name(model._meta.db_table))
+            )
+
+    rng = random.Random(seed)
+    for model, field in ((Cat, "bio"), (Dog, "bark")):
+        for start in range(0, size, batch_size):
+            model.objects.bulk_create(
+                [
+                    model(
+                        name="{} {}".format(model.__name__, i),
+                        **{field: make_text(rng, text_size, rng.random() < match_rate)}
+                    )
+                    for i in range(start, min(start + batch_size, size))
+                ]
+            )
+
+
+class Measurement:
+    def __init__(self, connection):
+        self.connection = connection
+        self.queries = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.queries += 1
+        return execute(sql, params, many, context)
+
+    def __enter__(self):
+        self.wrapper = self.connection.execute_wrapper(self)
+        self.wrapper.__enter__()
+        tracemalloc.start()
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.seconds = time.perf_counter() - self.start
+        _, self.peak_memory = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        self.wrapper.__exit__(*exc_info)
+
+
+def make_request(data):
+    from django.contrib.messages.middleware import MessageMiddleware
+    from django.contrib.sessions.middleware import SessionMiddleware
+    from django.test import RequestFactory
+
+    request = RequestFactory().post("/", data)
+    SessionMiddleware(lambda request: None).process_request(request)
+    MessageMiddleware(lambda request: None).process_request(request)
+    return request
+
+
+def run_phases(view_options):
+    from django.db import connection
+
+    from search_and_replace.tests import Cat, Dog
+    from search_and_replace.views import SearchAndReplaceView
+
+    models_and_fields = [(Cat, ("name", "bio")), (Dog, ("name", "bark"))]
+    # the fields selected by every phase
+    selected_fields = [(Cat, ("bio",)), (Dog, ("bark",))]
+    view = SearchAndReplaceView.as_view(
+        models_and_fields=models_and_fields, **view_options
+    )
+    data = {
+        "search": SEARCH,
+        "replace": REPLACE,
+        "search_and_replace_cat_bio": "true",
+        "search_and_replace_dog_bark": "true",
+    }
+
+    def filter_qs():
+        instance = SearchAndReplaceView(
+            models_and_fields=models_and_fields, **view_options
+        )
+        return sum(
+            instance.filter_qs(SEARCH, model, fields).count()
+            for model, fields in selected_fields
+        )
+
+    def preview():
+        return len(view(make_request(data)).render().content)
+
+    def apply():
+        return view(
+            make_request(dict(data, apply="true", preview_id=str(uuid.uuid4())))
+        ).status_code
+
+    results = []
+    for phase, fn in (("filter_qs", filter_qs), ("preview", preview), ("apply", apply)):
+        with Measurement(connection) as measurement:
+            result = fn()
+        results.append(
+            {
+                "phase": phase,
+                "seconds": measurement.seconds,
+                "queries": measurement.queries,
+                "peak_memory": measurement.peak_memory,
+                "result": result,
+            }
+        )
+    return results
+
+
+def parse_view_option(value):
+    key, _, raw = value.partition("=")
+    try:
+        return key, json.loads(raw)
+    except ValueError:
+        return key, raw
+
+
+def benchmark(options):
+    if options.postgres:
+        database = {
+            "ENGINE": "django.db.backends.postgresql",
+            "NAME": options.postgres,
+        }
+        backend = "postgresql"
+    else:
+        directory = tempfile.mkdtemp()
+        database = {
+            "ENGINE": "django.db.backends.sqlite3",
+            "NAME": os.path.join(directory, "benchmark.sqlite3"),
+        }
+        backend = "sqlite"
+    configure(database)
+
+    from django.core.management import call_command
+
+    import search_and_replace.tests  # noqa, registers the Cat and Dog models
+
+    call_command("migrate", run_syncdb=True, verbosity=0)
+    if options.search_index:
+        from search_and_replace.search_index import register_indexed_fields
+        from search_and_replace.tests import Cat, Dog
+
+        # SEARCH_AND_REPLACE_INDEX is read before the test models are loaded
+        register_indexed_fields(Cat, ["bio"])
+        register_indexed_fields(Dog, ["bark"])
+    if options.indexes:
+        # created once, the indexes are maintained while the data of every size is loaded
+        call_command("search_and_replace_indexes", stdout=sys.stderr)
+
+    view_options = dict(parse_view_option(value) for value in options.view_option)
+    if options.search_index:
+        view_options["search_index"] = True
+    results = []
+    for size in options.sizes:
+        load_data(size, options.text_size, options.match_rate)
+        if options.search_index:
+            # bulk_create() doesn't index the rows
+            call_command("search_and_replace_index", stdout=sys.stderr)
+        for result in run_phases(view_options):
+            result.update(backend=backend, rows=size)
+            results.append(result)
+            print(
+                "{backend} {rows:>9} rows {phase:<10} {seconds:8.3f}s "
+                "{queries:>7} queries {peak_memory:>12} bytes".format(**result),
+                file=sys.stderr,
+            )
+
+    output = {
+        "python": platform.python_version(),
+        "django": django.get_version(),
+        "text_size": options.text_size,
+        "match_rate": options.match_rate,
+        "indexes": options.indexes,
+        "search_index": options.search_index,
+        "view_options": view_options,
+        "results": results,
+    }
+    if options.output:
+        with open(options.output, "w") as f:
+            json.dump(output, f, indent=2)
+    else:
+        json.dump(output, sys.stdout, indent=2)
+
+
+if __name__ == "__main__":
+    sys.path.append("./src")
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument(
+        "--sizes", type=int, nargs="+", default=[10000, 100000, 1000000]
+    )
+    parser.add_argument(
+        "--text-size", type=int, default=500, help="Characters per text field."
+    )
+    parser.add_argument(
+        "--match-rate",
+        type=float,
+        default=0.01,
+        help="Fraction of the rows containing the search term.",
+    )
+    parser.add_argument(
+        "--postgres",
+        metavar="NAME",
+        help="Use the given PostgreSQL database, connection settings are read "
+        "from the PG* environment variables.",
+    )
+    parser.add_argument(
+        "--view-option",
+        action="append",
+        default=[],
+        metavar="KEY=VALUE",
+        help="Passed to SearchAndReplaceView.as_view(), values are parsed as JSON.",
+    )
+    parser.add_argument(
+        "--indexes",
+        action="store_true",
+        help="Create the indexes recommended by search_and_replace_indexes first.",
+    )
+    parser.add_argument(
+        "--search-index",
+        action="store_true",
+        help="Build the n-gram index of the searched fields after loading the data and "
+        "search with it.",
+    )
+    parser.add_argument("--output", help="Write the JSON results to this file.")
+    benchmark(parser.parse_args())
@@ -12,7 +12,8 @@ from django.core.management import call_command
 def runtests(test_path="search_and_replace"):
     if not settings.configured:
         DATABASES = {
-            "default": {"ENGINE": "django.db.backends.sqlite3", "NAME": ":memory:"}
+            "default": {"ENGINE": "django.db.backends.sqlite3", "NAME": ":memory:"},
+            "other": {"ENGINE": "django.db.backends.sqlite3", "NAME": ":memory:"},
         }
         settings.configure(
             DATABASES=DATABASES,
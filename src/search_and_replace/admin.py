@@ -1,3 +1,70 @@
-from django.contrib import admin
+from django.contrib import admin, messages
+from django.utils.translation import gettext_lazy as _
 
-# Register your models here.
+from .models import SearchAndReplaceJob, SearchAndReplaceJobProgress
+from .views import SearchAndReplaceView
+
+
+class SearchAndReplaceJobProgressInline(admin.TabularInline):
+    model = SearchAndReplaceJobProgress
+    fields = readonly_fields = (
+        "model",
+        "database",
+        "fields",
+        "rows_scanned",
+        "rows_changed",
+        "started",
+        "finished",
+    )
+    extra = 0
+    can_delete = False
+
+    def has_add_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(SearchAndReplaceJob)
+class SearchAndReplaceJobAdmin(admin.ModelAdmin):
+    list_display = ("__str__", "status", "created", "finished", "reverted")
+    list_filter = ("status",)
+    readonly_fields = (
+        "search",
+        "replace",
+        "status",
+        "error",
+        "created",
+        "started",
+        "finished",
+        "reverted",
+    )
+    inlines = [SearchAndReplaceJobProgressInline]
+    actions = ["revert"]
+
+    def has_add_permission(self, request):
+        return False
+
+    def revert(self, request, queryset):
+        view = SearchAndReplaceView()
+        for job in queryset:
+            if not job.is_finished or job.reverted:
+                self.message_user(
+                    request,
+                    _("{} is still running or was reverted already").format(job),
+                    messages.WARNING,
+                )
+                continue
+            count = view.revert_job(job)
+            self.message_user(
+                request, _("Restored {} values replaced by {}").format(count, job)
+            )
+            if view.skipped_changes:
+                self.message_user(
+                    request,
+                    _("Skipped {} values changed since {}").format(
+                        view.skipped_changes, job
+                    ),
+                    messages.WARNING,
+                )
+
+    revert.short_description = _("Revert the selected jobs")
+    revert.allowed_permissions = ("change",)
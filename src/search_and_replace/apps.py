@@ -3,3 +3,13 @@ from django.apps import AppConfig
 
 class SearchAndReplaceConfig(AppConfig):
     name = "search_and_replace"
+    default_auto_field = "django.db.models.AutoField"
+
+    def ready(self):
+        # connect the receivers keeping the n-gram index and the preview data versions up
+        # to date in every process
+        from .preview_cache import register_settings_models
+        from .search_index import register_settings_fields
+
+        register_settings_fields()
+        register_settings_models()
@@ -0,0 +1,87 @@
+class Snippet:
+    """
+    A window of a value around one or more neighbouring occurrences, before and after
+    replacing them.
+    """
+
+    __slots__ = ("old", "new", "truncated_start", "truncated_end")
+
+    def __init__(self, old, new, truncated_start, truncated_end):
+        self.old = old
+        self.new = new
+        self.truncated_start = truncated_start
+        self.truncated_end = truncated_end
+
+    def __repr__(self):
+        return "<Snippet {!r} -> {!r}>".format(self.old, self.new)
+
+
+class PreviewInstance:
+    """
+    The primary key and string representation of a changed instance, kept by the preview
+    instead of the instance with all its loaded values.
+    """
+
+    __slots__ = ("pk", "label")
+
+    def __init__(self, instance):
+        self.pk = instance.pk
+        self.label = str(instance)
+
+    def __str__(self):
+        return self.label
+
+    def __repr__(self):
+        return "<PreviewInstance {} {!r}>".format(self.pk, self.label)
+
+
+class FieldDiff:
+    """
+    The snippets of a changed field shown by the preview instead of the complete values.
+    """
+
+    __slots__ = ("field", "snippets", "occurrences")
+
+    def __init__(self, field, snippets, occurrences):
+        self.field = field
+        self.snippets = snippets
+        self.occurrences = occurrences
+
+    def __repr__(self):
+        return "<FieldDiff {} {!r}>".format(self.field, self.snippets)
+
+
+def get_snippets(value, matches, context_size):
+    """
+    Returns a list of Snippets for the (start, end, replacement) matches of value,
+    each with up to context_size characters before and after its occurrences.
+    Occurrences with overlapping context share a snippet.
+    """
+    windows = []
+    for start, end, replacement in matches:
+        window_start = max(start - context_size, 0)
+        window_end = min(end + context_size, len(value))
+        if windows and window_start <= windows[-1][1]:
+            windows[-1][1] = window_end
+            windows[-1][2].append((start, end, replacement))
+        else:
+            windows.append([window_start, window_end, [(start, end, replacement)]])
+
+    snippets = []
+    for window_start, window_end, window_matches in windows:
+        parts = []
+        position = window_start
+        for start, end, replacement in window_matches:
+            parts.append(value[position:start])
+            parts.append(replacement)
+            position = end
+        parts.append(value[position:window_end])
+        snippets.append(
+            Snippet(
+                value[window_start:window_end],
+                "".join(parts),
+                window_start > 0,
+                window_end < len(value),
+            )
+        )
+    return snippets
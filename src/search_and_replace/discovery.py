@@ -0,0 +1,34 @@
+from django.urls import URLResolver, get_resolver
+
+from .views import SearchAndReplaceView
+
+
+def _iter_patterns(patterns, namespace=None):
+    for pattern in patterns:
+        if isinstance(pattern, URLResolver):
+            sub_namespace = namespace
+            if pattern.namespace:
+                sub_namespace = (
+                    "{}:{}".format(namespace, pattern.namespace)
+                    if namespace
+                    else pattern.namespace
+                )
+            yield from _iter_patterns(pattern.url_patterns, sub_namespace)
+        else:
+            name = pattern.name
+            if name and namespace:
+                name = "{}:{}".format(namespace, name)
+            yield name, pattern.callback
+
+
+def get_views(urlconf=None):
+    """
+    Returns a list of (url name, view instance) tuples for every SearchAndReplaceView
+    in the url configuration, so commands can reuse the configured models_and_fields.
+    """
+    views = []
+    for name, callback in _iter_patterns(get_resolver(urlconf).url_patterns):
+        view_class = getattr(callback, "view_class", None)
+        if view_class is not None and issubclass(view_class, SearchAndReplaceView):
+            views.append((name, view_class(**callback.view_initkwargs)))
+    return views
@@ -0,0 +1,48 @@
+from concurrent.futures import Future, ThreadPoolExecutor
+
+from django.db import connections
+
+
+class ImmediateExecutor:
+    """
+    Runs submitted callables synchronously, e.g. for tests or debugging.
+    """
+
+    def submit(self, fn, *args, **kwargs):
+        future = Future()
+        try:
+            future.set_result(fn(*args, **kwargs))
+        except BaseException as e:
+            future.set_exception(e)
+        return future
+
+
+class ThreadExecutor(ThreadPoolExecutor):
+    """
+    A thread pool closing the database connections of its threads after every call.
+    """
+
+    def submit(self, fn, *args, **kwargs):
+        return super().submit(self._run, fn, *args, **kwargs)
+
+    @staticmethod
+    def _run(fn, *args, **kwargs):
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            connections.close_all()
+
+
+_default_executor = None
+
+
+def get_default_executor():
+    """
+    Returns the in-process executor shared by all views running background jobs.
+    """
+    global _default_executor
+    if _default_executor is None:
+        _default_executor = ThreadExecutor(
+            max_workers=1, thread_name_prefix="search-and-replace"
+        )
+    return _default_executor
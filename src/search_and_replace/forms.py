@@ -1,10 +1,47 @@
+import re
+from collections import namedtuple
+
 from django import forms
 from django.db.models.options import Options
+from django.db.models.signals import class_prepared
+from django.dispatch import receiver
+from django.utils.translation import gettext_lazy as _
+
+from .paths import get_field_path
+
+PAIR_SEPARATOR = " => "
+
+FieldDescriptor = namedtuple("FieldDescriptor", ("field", "form_field_name", "label"))
+
+# (form class, models and fields) -> (
+#     ((model, (FieldDescriptor, ...)), ...), frozenset of form field names
+# )
+_field_descriptors = {}
+
+
+@receiver(class_prepared)
+def clear_field_descriptors(sender, **kwargs):
+    """
+    Models were (re)loaded, e.g. by reloading the app registry, cached fields may be stale.
+    """
+    _field_descriptors.clear()
 
 
 class SearchAndReplaceForm(forms.Form):
     search = forms.CharField(strip=False)
     replace = forms.CharField(required=False, strip=False)
+    regex = forms.BooleanField(required=False, label=_("Regular expression"))
+    ignore_case = forms.BooleanField(required=False, label=_("Ignore case"))
+    whole_word = forms.BooleanField(required=False, label=_("Whole words only"))
+    pairs = forms.CharField(
+        required=False,
+        strip=False,
+        widget=forms.Textarea(attrs={"rows": 3}),
+        label=_("Additional replacements"),
+        help_text=_("One search => replace pair per line."),
+    )
+
+    option_fields = ("regex", "ignore_case", "whole_word", "pairs")
 
     def _get_form_field_name(self, model, field):
         opts = model._meta
@@ -12,34 +49,67 @@ class SearchAndReplaceForm(forms.Form):
         return "{}_{}_{}".format(opts.app_label, opts.model_name, field)
 
     def _get_field_label(self, model, field):
-        opts = model._meta
-        assert isinstance(opts, Options)
-        return opts.get_field(field).verbose_name
+        return get_field_path(model, field).label
+
+    def get_field_descriptors(self):
+        """
+        Returns a tuple of (model, (FieldDescriptor, ...)) tuples, one per entry of
+        models_and_fields. Computed once per form class and models_and_fields.
+        """
+        return self._get_cached_fields()[0]
+
+    def get_form_field_names(self):
+        """
+        Returns a frozenset of the names of the form fields selecting models and fields.
+        """
+        return self._get_cached_fields()[1]
+
+    def _get_cached_fields(self):
+        key = (
+            self.__class__,
+            tuple((model, tuple(fields)) for model, fields in self.models_and_fields),
+        )
+        cached = _field_descriptors.get(key)
+        if cached is None:
+            descriptors = tuple(
+                (
+                    model,
+                    tuple(
+                        FieldDescriptor(
+                            field,
+                            self._get_form_field_name(model, field),
+                            self._get_field_label(model, field),
+                        )
+                        for field in fields
+                    ),
+                )
+                for model, fields in self.models_and_fields
+            )
+            names = frozenset(
+                descriptor.form_field_name
+                for _, model_descriptors in descriptors
+                for descriptor in model_descriptors
+            )
+            cached = _field_descriptors[key] = (descriptors, names)
+        return cached
 
     def get_form_fields_by_model(self):
         """
         Returns a list of (model verbose name, [form field, ...]) tuples.
         Used to render the form.
         """
-        results = []
-        for model, fields in self.models_and_fields:
-            form_fields = []
-            for field in fields:
-                form_field_name = self._get_form_field_name(model, field)
-                form_fields.append(self[form_field_name])
-            results.append((model, form_fields))
-        return results
+        return [
+            (model, [self[descriptor.form_field_name] for descriptor in descriptors])
+            for model, descriptors in self.get_field_descriptors()
+        ]
 
     def get_extra_form_fields(self):
         """
-        Returns all fields except search, replace and the ones returned by get_form_fields_by_model.
+        Returns all fields except search, replace, the option fields and the ones returned by
+        get_form_fields_by_model.
         """
-        ignored = {"search", "replace"}.union(
-            {
-                self._get_form_field_name(model, field)
-                for model, fields in self.models_and_fields
-                for field in fields
-            }
+        ignored = {"search", "replace", *self.option_fields}.union(
+            self.get_form_field_names()
         )
         fields = []
         for field in self.fields:
@@ -47,18 +117,71 @@ class SearchAndReplaceForm(forms.Form):
                 fields.append(self[field])
         return fields
 
+    def get_option_fields(self):
+        return [self[field] for field in self.option_fields]
+
+    def clean_pairs(self):
+        pairs = []
+        for line in self.cleaned_data["pairs"].splitlines():
+            if not line.strip():
+                continue
+            search, separator, replace = line.partition(PAIR_SEPARATOR)
+            if not separator or not search:
+                raise forms.ValidationError(
+                    _("Enter one search => replace pair per line.")
+                )
+            pairs.append((search, replace))
+        return tuple(pairs)
+
+    def clean(self):
+        cleaned_data = super().clean()
+        if cleaned_data.get("regex"):
+            if cleaned_data.get("pairs"):
+                raise forms.ValidationError(
+                    _("Additional replacements can't be used with regular expressions.")
+                )
+            if "search" in cleaned_data:
+                try:
+                    pattern = re.compile(cleaned_data["search"])
+                except re.error as e:
+                    self.add_error(
+                        "search",
+                        _("Invalid regular expression: {}").format(e),
+                    )
+                    return cleaned_data
+                # the replacement template is parsed before matching, even without a match
+                try:
+                    pattern.sub(cleaned_data.get("replace", ""), "")
+                except re.error as e:
+                    self.add_error(
+                        "replace",
+                        _("Invalid replacement: {}").format(e),
+                    )
+        return cleaned_data
+
+    def get_replace_options(self):
+        """
+        Returns the options passed to the view's get_replacer.
+        """
+        return {
+            "regex": self.cleaned_data["regex"],
+            "ignore_case": self.cleaned_data["ignore_case"],
+            "whole_word": self.cleaned_data["whole_word"],
+            "pairs": self.cleaned_data["pairs"],
+        }
+
     def get_selected_fields(self):
         """
         Returns a list of (Model, [field name, ...]) tuples that were selected by the user.
         Used by the SearchAndReplaceView to decide which models / fields to target.
         """
         results = []
-        for model, fields in self.models_and_fields:
-            selected = []
-            for field in fields:
-                form_field_name = self._get_form_field_name(model, field)
-                if self.cleaned_data[form_field_name]:
-                    selected.append(field)
+        for model, descriptors in self.get_field_descriptors():
+            selected = [
+                descriptor.field
+                for descriptor in descriptors
+                if self.cleaned_data[descriptor.form_field_name]
+            ]
             if selected:
                 results.append((model, selected))
         return results
@@ -66,10 +189,8 @@ class SearchAndReplaceForm(forms.Form):
     def __init__(self, models_and_fields, data=None, files=None, **kwargs):
         self.models_and_fields = models_and_fields
         super().__init__(data, files, **kwargs)
-        for model, fields in models_and_fields:
-            for field in fields:
-                form_field_name = self._get_form_field_name(model, field)
-                field_label = self._get_field_label(model, field)
-                self.fields[form_field_name] = forms.BooleanField(
-                    required=False, label=field_label, initial=True
+        for _, descriptors in self.get_field_descriptors():
+            for descriptor in descriptors:
+                self.fields[descriptor.form_field_name] = forms.BooleanField(
+                    required=False, label=descriptor.label, initial=True
                 )
@@ -0,0 +1,217 @@
+import json
+import os
+import traceback
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from search_and_replace.discovery import get_views
+
+
+class Command(BaseCommand):
+    help = (
+        "Searches and replaces in the models and fields of a search and replace view, "
+        "processing every model in primary key ordered batches. With --checkpoint the "
+        "last processed primary key is recorded so an interrupted run can be resumed."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("search")
+        parser.add_argument("replace", nargs="?", default="")
+        parser.add_argument(
+            "--view",
+            help="Url name of the search and replace view, required if there are several.",
+        )
+        parser.add_argument(
+            "--model",
+            action="append",
+            dest="models",
+            metavar="APP_LABEL.MODEL_NAME",
+            help="Only replace in this model, may be given several times.",
+        )
+        parser.add_argument(
+            "--field",
+            action="append",
+            dest="fields",
+            metavar="FIELD",
+            help="Only replace in this field, may be given several times.",
+        )
+        parser.add_argument(
+            "--regex",
+            action="store_true",
+            help="Search for a regular expression.",
+        )
+        parser.add_argument(
+            "--ignore-case",
+            action="store_true",
+            help="Match regardless of upper and lower case.",
+        )
+        parser.add_argument(
+            "--whole-word",
+            action="store_true",
+            help="Only match whole words.",
+        )
+        parser.add_argument(
+            "--pair",
+            action="append",
+            dest="pairs",
+            default=[],
+            metavar="'SEARCH => REPLACE'",
+            help="An additional replacement, may be given several times.",
+        )
+        parser.add_argument(
+            "--database",
+            action="append",
+            dest="databases",
+            metavar="ALIAS",
+            help="Replace in this database instead of the databases of the view, may "
+            "be given several times.",
+        )
+        parser.add_argument("--batch-size", type=int)
+        parser.add_argument(
+            "--checkpoint",
+            metavar="PATH",
+            help="Record the progress in this file and resume from it if it exists.",
+        )
+
+    def get_view(self, name):
+        views = get_views()
+        if name is not None:
+            views = [
+                (view_name, view) for view_name, view in views if view_name == name
+            ]
+        if len(views) != 1:
+            raise CommandError(
+                "Use --view to choose one of the search and replace views: {}".format(
+                    ", ".join(str(view_name) for view_name, view in get_views())
+                )
+            )
+        return views[0][1]
+
+    def get_form(self, view, options):
+        form = view.form_class(view.models_and_fields)
+        data = {
+            "search": options["search"],
+            "replace": options["replace"],
+            "regex": options["regex"],
+            "ignore_case": options["ignore_case"],
+            "whole_word": options["whole_word"],
+            "pairs": "\n".join(options["pairs"]),
+        }
+        for model, fields in view.models_and_fields:
+            if options["models"] and model._meta.label_lower not in options["models"]:
+                continue
+            for field in fields:
+                if not options["fields"] or field in options["fields"]:
+                    data[form._get_form_field_name(model, field)] = "on"
+
+        form = view.form_class(view.models_and_fields, data=data)
+        if not form.is_valid():
+            raise CommandError(form.errors.as_text())
+        if not form.get_selected_fields():
+            raise CommandError("No models and fields selected.")
+        return form
+
+    def load_checkpoint(self, path, signature):
+        if not path or not os.path.exists(path):
+            return {}
+        with open(path) as f:
+            checkpoint = json.load(f)
+        if checkpoint["signature"] != signature:
+            raise CommandError(
+                "The checkpoint {} belongs to a different search, remove it to start "
+                "over.".format(path)
+            )
+        return checkpoint["models"]
+
+    def save_checkpoint(self, path, signature, models):
+        temporary_path = "{}.tmp".format(path)
+        with open(temporary_path, "w") as f:
+            json.dump({"signature": signature, "models": models}, f, default=str)
+        os.replace(temporary_path, path)
+
+    def handle(self, *args, **options):
+        self.verbosity = options["verbosity"]
+        view = self.get_view(options["view"])
+        view.form = self.get_form(view, options)
+        view.replace_options = view.form.get_replace_options()
+        # batches are committed one by one, so a single UPDATE can't be resumed
+        view.database_replace = False
+        if options["batch_size"]:
+            view.batch_size = options["batch_size"]
+        if options["databases"]:
+            view.databases = options["databases"]
+
+        search = view.form.cleaned_data["search"]
+        replace = view.form.cleaned_data["replace"]
+        # json turns the pairs into lists
+        signature = json.loads(json.dumps(view.get_preview_signature(search, replace)))
+        checkpoint = options["checkpoint"]
+        models = self.load_checkpoint(checkpoint, signature)
+        view.resume_pks = {
+            label: state["last_pk"]
+            for label, state in models.items()
+            if state["last_pk"] is not None
+        }
+
+        if view.undo_log:
+            # the old values are logged for a job, which can be reverted in the admin
+            view.job = view.create_job(search, replace)
+            view.job.status = view.job.RUNNING
+            view.job.started = timezone.now()
+            view.job.save(update_fields=["status", "started"])
+            self.stdout.write("Logging the old values as job {}".format(view.job.pk))
+
+        try:
+            self.replace_targets(view, search, replace, models, signature, checkpoint)
+        except BaseException:
+            if view.undo_log:
+                view.job.status = view.job.FAILED
+                view.job.error = traceback.format_exc()
+                view.job.finished = timezone.now()
+                view.job.save(update_fields=["status", "error", "finished"])
+            raise
+
+        if view.undo_log:
+            view.job.status = view.job.DONE
+            view.job.finished = timezone.now()
+            view.job.save(update_fields=["status", "finished"])
+
+    def replace_targets(self, view, search, replace, models, signature, checkpoint):
+        for model, fields, using in view.get_targets():
+            label = view.get_model_key(model, using)
+            state = models.setdefault(
+                label, {"last_pk": None, "scanned": 0, "changed": 0, "done": False}
+            )
+            if state["done"]:
+                self.stdout.write("{}: already done".format(label))
+                continue
+
+            def progress(scanned, changed, last_pk):
+                state["scanned"] += scanned
+                state["changed"] += changed
+                state["last_pk"] = last_pk
+                if checkpoint:
+                    self.save_checkpoint(checkpoint, signature, models)
+                if self.verbosity > 1:
+                    self.stdout.write(
+                        "{}: scanned {scanned}, changed {changed}".format(
+                            label, **state
+                        )
+                    )
+
+            view.apply_search_and_replace(
+                search,
+                replace,
+                model,
+                fields,
+                preview=False,
+                progress=progress,
+                using=using,
+            )
+            state["done"] = True
+            if checkpoint:
+                self.save_checkpoint(checkpoint, signature, models)
+            self.stdout.write(
+                "{}: scanned {scanned}, changed {changed}".format(label, **state)
+            )
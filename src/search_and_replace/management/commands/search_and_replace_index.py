@@ -0,0 +1,70 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Max
+
+from search_and_replace.discovery import get_views
+from search_and_replace.models import (
+    SearchAndReplaceIndexedField,
+    SearchAndReplaceNgram,
+)
+from search_and_replace.search_index import get_indexed_fields, index_instances
+from search_and_replace.views import SearchAndReplaceView
+
+
+class Command(BaseCommand):
+    help = (
+        "Builds the n-gram index of the models and fields in the SEARCH_AND_REPLACE_INDEX "
+        "setting. Saved instances are indexed automatically afterwards."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--view",
+            help="Url name of a search and replace view, only its models are indexed.",
+        )
+        parser.add_argument("--batch-size", type=int)
+
+    def handle(self, *args, **options):
+        indexed_fields = get_indexed_fields()
+        if not indexed_fields:
+            raise CommandError("No fields in the SEARCH_AND_REPLACE_INDEX setting.")
+
+        view = SearchAndReplaceView()
+        models = dict(indexed_fields)
+        if options["view"] is not None:
+            views = [view for name, view in get_views() if name == options["view"]]
+            if not views:
+                raise CommandError(
+                    "No search and replace view {}.".format(options["view"])
+                )
+            view = views[0]
+            models = {
+                model: models[model]
+                for model, fields in view.models_and_fields
+                if model in models
+            }
+        if options["batch_size"]:
+            view.batch_size = options["batch_size"]
+
+        for model, fields in models.items():
+            label = model._meta.label_lower
+            # searches don't use the index of model until it is rebuilt
+            SearchAndReplaceIndexedField.objects.filter(model=label).delete()
+            SearchAndReplaceNgram.objects.filter(model=label).delete()
+            # rows created while indexing are above it and searched without the index
+            max_pk = model._base_manager.aggregate(max_pk=Max("pk"))["max_pk"]
+            count = 0
+            qs = model._base_manager.only(model._meta.pk.name, *fields)
+            for batch in view.iter_batches(qs):
+                index_instances(model, batch, fields)
+                count += len(batch)
+            SearchAndReplaceIndexedField.objects.bulk_create(
+                [
+                    SearchAndReplaceIndexedField(
+                        model=label,
+                        field=field,
+                        max_pk="" if max_pk is None else str(max_pk),
+                    )
+                    for field in fields
+                ]
+            )
+            self.stdout.write("{}: indexed {} instances".format(label, count))
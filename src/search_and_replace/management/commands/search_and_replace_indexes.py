@@ -0,0 +1,61 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections, router
+
+from search_and_replace.discovery import get_views
+
+
+class Command(BaseCommand):
+    help = (
+        "Creates the indexes recommended by the search backends to speed up searching "
+        "the models and fields of the search and replace views."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--view",
+            help="Url name of the search and replace view, defaults to all views.",
+        )
+        parser.add_argument(
+            "--sql",
+            action="store_true",
+            help="Print the SQL statements instead of executing them.",
+        )
+        parser.add_argument(
+            "--ignore-case",
+            action="store_true",
+            help="Also create the indexes used by case insensitive searches.",
+        )
+
+    def handle(self, *args, **options):
+        views = [
+            view
+            for name, view in get_views()
+            if options["view"] is None or name == options["view"]
+        ]
+        if not views:
+            raise CommandError("No search and replace view found.")
+
+        statements = {}
+        for view in views:
+            for model, fields in view.models_and_fields:
+                using = router.db_for_write(model)
+                backend = view.get_search_backend(model)
+                for statement in backend.get_index_statements(
+                    model, fields, ignore_case=options["ignore_case"]
+                ):
+                    statements.setdefault(using, []).append(statement)
+
+        if not statements:
+            self.stdout.write("No indexes recommended for the configured databases.")
+
+        for using, using_statements in statements.items():
+            # keep the order but skip statements required by several models
+            using_statements = list(dict.fromkeys(using_statements))
+            if options["sql"]:
+                for statement in using_statements:
+                    self.stdout.write("{};".format(statement))
+                continue
+            with connections[using].cursor() as cursor:
+                for statement in using_statements:
+                    self.stdout.write(statement)
+                    cursor.execute(statement)
@@ -0,0 +1,52 @@
+# Generated by Django 3.2.25 on 2026-10-17 20:39
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SearchAndReplaceJob',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('search', models.TextField(verbose_name='search')),
+                ('replace', models.TextField(blank=True, verbose_name='replace')),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('running', 'Running'), ('done', 'Done'), ('failed', 'Failed')], default='pending', max_length=16, verbose_name='status')),
+                ('error', models.TextField(blank=True, verbose_name='error')),
+                ('created', models.DateTimeField(auto_now_add=True, verbose_name='created')),
+                ('started', models.DateTimeField(blank=True, null=True, verbose_name='started')),
+                ('finished', models.DateTimeField(blank=True, null=True, verbose_name='finished')),
+            ],
+            options={
+                'verbose_name': 'search and replace job',
+                'verbose_name_plural': 'search and replace jobs',
+                'ordering': ('-created',),
+            },
+        ),
+        migrations.CreateModel(
+            name='SearchAndReplaceJobProgress',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('position', models.PositiveIntegerField(verbose_name='position')),
+                ('model', models.CharField(max_length=255, verbose_name='model')),
+                ('fields', models.TextField(verbose_name='fields')),
+                ('rows_scanned', models.PositiveIntegerField(default=0, verbose_name='rows scanned')),
+                ('rows_changed', models.PositiveIntegerField(default=0, verbose_name='rows changed')),
+                ('started', models.DateTimeField(blank=True, null=True, verbose_name='started')),
+                ('finished', models.DateTimeField(blank=True, null=True, verbose_name='finished')),
+                ('job', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='progress', to='search_and_replace.searchandreplacejob')),
+            ],
+            options={
+                'verbose_name': 'search and replace job progress',
+                'verbose_name_plural': 'search and replace job progress',
+                'ordering': ('job', 'position'),
+            },
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 3.2.25 on 2026-10-17 20:42
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('search_and_replace', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='searchandreplacejob',
+            name='pairs',
+            field=models.TextField(blank=True, verbose_name='additional replacements'),
+        ),
+        migrations.AddField(
+            model_name='searchandreplacejob',
+            name='regex',
+            field=models.BooleanField(default=False, verbose_name='regular expression'),
+        ),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 3.2.25 on 2026-10-17 20:55
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('search_and_replace', '0002_job_replace_options'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='searchandreplacejob',
+            name='reverted',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='reverted'),
+        ),
+        migrations.CreateModel(
+            name='SearchAndReplaceChange',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('model', models.CharField(max_length=255, verbose_name='model')),
+                ('object_id', models.CharField(max_length=255, verbose_name='object id')),
+                ('field', models.CharField(max_length=255, verbose_name='field')),
+                ('old_value', models.TextField(verbose_name='old value')),
+                ('job', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='changes', to='search_and_replace.searchandreplacejob')),
+            ],
+            options={
+                'verbose_name': 'search and replace change',
+                'verbose_name_plural': 'search and replace changes',
+                'ordering': ('job', 'id'),
+            },
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 3.2.25 on 2026-10-17 20:57
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('search_and_replace', '0003_undo_log'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SearchAndReplaceNgram',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('model', models.CharField(max_length=255, verbose_name='model')),
+                ('field', models.CharField(max_length=255, verbose_name='field')),
+                ('object_id', models.CharField(max_length=255, verbose_name='object id')),
+                ('ngram', models.CharField(max_length=3, verbose_name='n-gram')),
+            ],
+            options={
+                'verbose_name': 'search and replace n-gram',
+                'verbose_name_plural': 'search and replace n-grams',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='searchandreplacengram',
+            index=models.Index(fields=['model', 'ngram', 'field', 'object_id'], name='search_and__model_07ddff_idx'),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 3.2.25 on 2026-10-17 21:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('search_and_replace', '0004_ngram_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='searchandreplacejob',
+            name='ignore_case',
+            field=models.BooleanField(default=False, verbose_name='ignore case'),
+        ),
+        migrations.AddField(
+            model_name='searchandreplacejob',
+            name='whole_word',
+            field=models.BooleanField(default=False, verbose_name='whole words only'),
+        ),
+    ]
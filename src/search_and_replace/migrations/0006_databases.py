@@ -0,0 +1,23 @@
+# Generated by Django 3.2.25 on 2026-10-17 21:06
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('search_and_replace', '0005_ignore_case_whole_word'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='searchandreplacechange',
+            name='database',
+            field=models.CharField(blank=True, max_length=255, verbose_name='database'),
+        ),
+        migrations.AddField(
+            model_name='searchandreplacejobprogress',
+            name='database',
+            field=models.CharField(blank=True, max_length=255, verbose_name='database'),
+        ),
+    ]
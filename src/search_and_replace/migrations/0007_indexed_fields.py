@@ -0,0 +1,27 @@
+# Generated by Django 3.2.25 on 2026-10-17 21:19
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('search_and_replace', '0006_databases'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SearchAndReplaceIndexedField',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('model', models.CharField(max_length=255, verbose_name='model')),
+                ('field', models.CharField(max_length=255, verbose_name='field')),
+                ('built', models.DateTimeField(auto_now=True, verbose_name='built')),
+            ],
+            options={
+                'verbose_name': 'search and replace indexed field',
+                'verbose_name_plural': 'search and replace indexed fields',
+                'unique_together': {('model', 'field')},
+            },
+        ),
+    ]
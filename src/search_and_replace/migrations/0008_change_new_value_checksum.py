@@ -0,0 +1,18 @@
+# Generated by Django 3.2.25 on 2026-10-17 21:33
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('search_and_replace', '0007_indexed_fields'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='searchandreplacechange',
+            name='new_value_checksum',
+            field=models.CharField(blank=True, max_length=16, verbose_name='new value checksum'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 3.2.25 on 2026-10-17 21:35
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('search_and_replace', '0008_change_new_value_checksum'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='searchandreplaceindexedfield',
+            name='max_pk',
+            field=models.CharField(blank=True, max_length=255, verbose_name='maximum primary key'),
+        ),
+    ]
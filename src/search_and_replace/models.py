@@ -1,3 +1,185 @@
+import json
+
 from django.db import models
+from django.utils import timezone
+from django.utils.translation import gettext_lazy as _
+
+
+class SearchAndReplaceJob(models.Model):
+    PENDING = "pending"
+    RUNNING = "running"
+    DONE = "done"
+    FAILED = "failed"
+    STATUS_CHOICES = (
+        (PENDING, _("Pending")),
+        (RUNNING, _("Running")),
+        (DONE, _("Done")),
+        (FAILED, _("Failed")),
+    )
+
+    search = models.TextField(_("search"))
+    replace = models.TextField(_("replace"), blank=True)
+    regex = models.BooleanField(_("regular expression"), default=False)
+    ignore_case = models.BooleanField(_("ignore case"), default=False)
+    whole_word = models.BooleanField(_("whole words only"), default=False)
+    pairs = models.TextField(_("additional replacements"), blank=True)
+    status = models.CharField(
+        _("status"), max_length=16, choices=STATUS_CHOICES, default=PENDING
+    )
+    error = models.TextField(_("error"), blank=True)
+    created = models.DateTimeField(_("created"), auto_now_add=True)
+    started = models.DateTimeField(_("started"), null=True, blank=True)
+    finished = models.DateTimeField(_("finished"), null=True, blank=True)
+    reverted = models.DateTimeField(_("reverted"), null=True, blank=True)
+
+    class Meta:
+        ordering = ("-created",)
+        verbose_name = _("search and replace job")
+        verbose_name_plural = _("search and replace jobs")
+
+    def __str__(self):
+        return "{} → {}".format(self.search, self.replace)
+
+    def set_replace_options(self, options):
+        self.regex = options.get("regex", False)
+        self.ignore_case = options.get("ignore_case", False)
+        self.whole_word = options.get("whole_word", False)
+        self.pairs = json.dumps(options.get("pairs", ()))
+
+    def get_replace_options(self):
+        return {
+            "regex": self.regex,
+            "ignore_case": self.ignore_case,
+            "whole_word": self.whole_word,
+            "pairs": tuple(tuple(pair) for pair in json.loads(self.pairs or "[]")),
+        }
+
+    @property
+    def is_finished(self):
+        return self.status in (self.DONE, self.FAILED)
+
+    def get_progress_data(self):
+        """
+        Returns the status and per model progress of the job as a json serializable dict.
+        """
+        return {
+            "status": self.status,
+            "status_display": str(self.get_status_display()),
+            "error": self.error,
+            "models": [progress.get_data() for progress in self.progress.all()],
+        }
+
+
+class SearchAndReplaceJobProgress(models.Model):
+    job = models.ForeignKey(
+        SearchAndReplaceJob, related_name="progress", on_delete=models.CASCADE
+    )
+    position = models.PositiveIntegerField(_("position"))
+    model = models.CharField(_("model"), max_length=255)
+    # empty for the database chosen by the router
+    database = models.CharField(_("database"), max_length=255, blank=True)
+    fields = models.TextField(_("fields"))
+    rows_scanned = models.PositiveIntegerField(_("rows scanned"), default=0)
+    rows_changed = models.PositiveIntegerField(_("rows changed"), default=0)
+    started = models.DateTimeField(_("started"), null=True, blank=True)
+    finished = models.DateTimeField(_("finished"), null=True, blank=True)
+
+    class Meta:
+        ordering = ("job", "position")
+        verbose_name = _("search and replace job progress")
+        verbose_name_plural = _("search and replace job progress")
+
+    def __str__(self):
+        if self.database:
+            return "{} ({})".format(self.model, self.database)
+        return self.model
+
+    def get_fields(self):
+        return self.fields.split(",")
+
+    @property
+    def elapsed(self):
+        """
+        Returns the seconds spent on this model so far, None if it was not started yet.
+        """
+        if self.started is None:
+            return None
+        return ((self.finished or timezone.now()) - self.started).total_seconds()
+
+    def get_data(self):
+        return {
+            "model": self.model,
+            "fields": self.get_fields(),
+            "rows_scanned": self.rows_scanned,
+            "rows_changed": self.rows_changed,
+            "elapsed": self.elapsed,
+            "finished": self.finished is not None,
+        }
+
+
+class SearchAndReplaceChange(models.Model):
+    """
+    The value of a field before a job replaced it, used to revert the job.
+    """
+
+    job = models.ForeignKey(
+        SearchAndReplaceJob, related_name="changes", on_delete=models.CASCADE
+    )
+    model = models.CharField(_("model"), max_length=255)
+    # empty for the database chosen by the router
+    database = models.CharField(_("database"), max_length=255, blank=True)
+    object_id = models.CharField(_("object id"), max_length=255)
+    field = models.CharField(_("field"), max_length=255)
+    old_value = models.TextField(_("old value"))
+    # checksum of the value written by the job, empty for changes logged before
+    new_value_checksum = models.CharField(
+        _("new value checksum"), max_length=16, blank=True
+    )
+
+    class Meta:
+        ordering = ("job", "id")
+        verbose_name = _("search and replace change")
+        verbose_name_plural = _("search and replace changes")
+
+    def __str__(self):
+        return "{} {} {}".format(self.model, self.object_id, self.field)
+
+
+class SearchAndReplaceNgram(models.Model):
+    """
+    An n-gram contained in a field of an instance, see search_and_replace.search_index.
+    """
+
+    model = models.CharField(_("model"), max_length=255)
+    field = models.CharField(_("field"), max_length=255)
+    object_id = models.CharField(_("object id"), max_length=255)
+    ngram = models.CharField(_("n-gram"), max_length=3)
+
+    class Meta:
+        indexes = [models.Index(fields=["model", "ngram", "field", "object_id"])]
+        verbose_name = _("search and replace n-gram")
+        verbose_name_plural = _("search and replace n-grams")
+
+    def __str__(self):
+        return self.ngram
+
+
+class SearchAndReplaceIndexedField(models.Model):
+    """
+    A field whose n-grams were indexed by the search_and_replace_index command,
+    the index is only used for the fields recorded here.
+    """
+
+    model = models.CharField(_("model"), max_length=255)
+    field = models.CharField(_("field"), max_length=255)
+    built = models.DateTimeField(_("built"), auto_now=True)
+    # the largest primary key when the index was built, empty if there were no rows
+    max_pk = models.CharField(_("maximum primary key"), max_length=255, blank=True)
+
+    class Meta:
+        unique_together = [("model", "field")]
+        verbose_name = _("search and replace indexed field")
+        verbose_name_plural = _("search and replace indexed fields")
 
-# Create your models here.
+    def __str__(self):
+        return "{}.{}".format(self.model, self.field)
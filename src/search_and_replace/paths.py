@@ -0,0 +1,186 @@
+import inspect
+from functools import lru_cache
+
+from django.core.exceptions import (
+    FieldDoesNotExist,
+    ImproperlyConfigured,
+    ObjectDoesNotExist,
+)
+from django.db import models
+from django.db.models.constants import LOOKUP_SEP
+from django.db.models.fields.json import KeyTextTransform, KeyTransform
+from django.db.models.functions import Cast
+from django.db.models.query_utils import DeferredAttribute
+from django.db.models.signals import class_prepared
+from django.dispatch import receiver
+from django.utils.text import format_lazy
+
+
+def is_json_field(field):
+    return field.get_internal_type() == "JSONField"
+
+
+def is_plain_text_field(model, field_name):
+    """
+    Returns True if field_name is a concrete char or text field that stores its value as is.
+    Fields using a custom descriptor (e.g. markup fields) are not considered plain.
+    """
+    try:
+        field = model._meta.get_field(field_name)
+    except FieldDoesNotExist:
+        return False
+    if not isinstance(field, (models.CharField, models.TextField)):
+        return False
+    descriptor = inspect.getattr_static(model, field.attname, None)
+    return isinstance(descriptor, DeferredAttribute)
+
+
+class FieldPath:
+    """
+    A field name of models_and_fields. Besides plain field names it may follow single
+    valued relations (author__bio) and end in the keys of a JSON field (data__title).
+    """
+
+    def __init__(self, model, path):
+        self.model = model
+        self.path = path
+        self.relations = []
+        self.keys = []
+        self.field = None
+        self.labels = []
+
+        current = model
+        parts = path.split(LOOKUP_SEP)
+        for index, part in enumerate(parts):
+            try:
+                field = current._meta.get_field(part)
+            except FieldDoesNotExist:
+                raise ImproperlyConfigured(
+                    "{} has no field {} (in {}).".format(
+                        current._meta.label, part, path
+                    )
+                )
+            if field.is_relation:
+                if not field.concrete or field.many_to_many or field.one_to_many:
+                    raise ImproperlyConfigured(
+                        "{} follows {}, only foreign keys and one to one fields can be "
+                        "followed.".format(path, part)
+                    )
+                self.relations.append(part)
+                self.labels.append(field.verbose_name)
+                current = field.related_model
+                continue
+            self.field = field
+            self.keys = parts[index + 1 :]
+            if self.keys and not is_json_field(field):
+                raise ImproperlyConfigured(
+                    "{} uses keys of {}, which is not a JSON field.".format(path, part)
+                )
+            break
+
+        if self.field is None:
+            raise ImproperlyConfigured("{} does not end in a field.".format(path))
+
+    def __repr__(self):
+        return "<FieldPath {}.{}>".format(self.model._meta.label, self.path)
+
+    @property
+    def is_plain(self):
+        return not self.relations and not self.keys
+
+    @property
+    def label(self):
+        if self.is_plain:
+            return self.field.verbose_name
+        labels = [*self.labels, self.field.verbose_name, *self.keys]
+        return format_lazy(" / ".join(["{}"] * len(labels)), *labels)
+
+    @property
+    def relation(self):
+        """
+        The relation to pass to select_related, None if the field is on the model itself.
+        """
+        return LOOKUP_SEP.join(self.relations) or None
+
+    @property
+    def field_path(self):
+        """
+        The lookup of the model field holding the value, without JSON keys.
+        """
+        return LOOKUP_SEP.join([*self.relations, self.field.name])
+
+    def get_text_expression(self):
+        """
+        Returns an expression selecting the JSON key as text, for filtering.
+        """
+        expression = self.field_path
+        for key in self.keys[:-1]:
+            expression = KeyTransform(key, expression)
+        return Cast(KeyTextTransform(self.keys[-1], expression), models.TextField())
+
+    def get_owner(self, instance):
+        """
+        Returns the instance holding the field, None if a relation is empty.
+        """
+        for relation in self.relations:
+            try:
+                instance = getattr(instance, relation)
+            except ObjectDoesNotExist:
+                return None
+            if instance is None:
+                return None
+        return instance
+
+    def get_container(self, owner):
+        """
+        Returns the dict or list of the JSON value holding the last key, None if missing.
+        """
+        container = getattr(owner, self.field.name)
+        for key in self.keys[:-1]:
+            container = self.get_item(container, key)
+        if isinstance(container, (dict, list)):
+            return container
+        return None
+
+    def get_item(self, container, key):
+        if isinstance(container, dict):
+            return container.get(key)
+        if isinstance(container, list) and key.isdigit() and int(key) < len(container):
+            return container[int(key)]
+        return None
+
+    def get_value(self, instance):
+        owner = self.get_owner(instance)
+        if owner is None:
+            return None
+        if not self.keys:
+            return getattr(owner, self.field.name)
+        return self.get_item(self.get_container(owner), self.keys[-1])
+
+    def set_value(self, instance, value):
+        """
+        Sets value on the instance holding the field, JSON values are changed in place.
+        Returns that instance, None if a relation or a JSON key is missing.
+        """
+        owner = self.get_owner(instance)
+        if owner is None:
+            return None
+        if not self.keys:
+            setattr(owner, self.field.name, value)
+        else:
+            container = self.get_container(owner)
+            if container is None:
+                return None
+            key = self.keys[-1]
+            container[int(key) if isinstance(container, list) else key] = value
+        return owner
+
+
+@lru_cache(maxsize=None)
+def get_field_path(model, path):
+    return FieldPath(model, path)
+
+
+@receiver(class_prepared)
+def clear_field_paths(sender, **kwargs):
+    get_field_path.cache_clear()
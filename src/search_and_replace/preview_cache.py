@@ -0,0 +1,99 @@
+import uuid
+
+from django.apps import apps
+from django.conf import settings
+from django.core.cache import cache
+from django.core.signals import setting_changed
+from django.db.models import Max
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+# the models whose previews can be cached by the views with cache_previews
+_versioned_models = set()
+
+
+def get_version_key(model):
+    return "search-replace-version-{}".format(model._meta.label_lower)
+
+
+def register_versioned_models(models):
+    """
+    Connects the receivers renewing the data versions of models, for these models only
+    to keep fast deletes of all other models.
+    """
+    for model in set(models) - _versioned_models:
+        post_save.connect(
+            update_data_version,
+            sender=model,
+            dispatch_uid="search_and_replace_data_version",
+        )
+        post_delete.connect(
+            update_data_version,
+            sender=model,
+            dispatch_uid="search_and_replace_data_version",
+        )
+        _versioned_models.add(model)
+
+
+def clear_versioned_models():
+    for model in _versioned_models:
+        post_save.disconnect(
+            sender=model, dispatch_uid="search_and_replace_data_version"
+        )
+        post_delete.disconnect(
+            sender=model, dispatch_uid="search_and_replace_data_version"
+        )
+    _versioned_models.clear()
+
+
+def register_settings_models():
+    """
+    Registers the models of the SEARCH_AND_REPLACE_VERSIONED_MODELS setting, a list of
+    "app_label.Model" labels. Called when the app is ready, so every process saving the
+    models renews their data versions.
+    """
+    register_versioned_models(
+        apps.get_model(label)
+        for label in getattr(settings, "SEARCH_AND_REPLACE_VERSIONED_MODELS", [])
+    )
+
+
+@receiver(setting_changed)
+def reload_versioned_models(setting, **kwargs):
+    if setting == "SEARCH_AND_REPLACE_VERSIONED_MODELS":
+        clear_versioned_models()
+        register_settings_models()
+
+
+def get_versioned_models():
+    """
+    Returns the set of the models registered for data versions.
+    """
+    return _versioned_models
+
+
+def bump_data_version(model):
+    """
+    Invalidates the cached previews of model.
+    """
+    cache.set(get_version_key(model), uuid.uuid4().hex, None)
+
+
+def get_data_version(model, using=None):
+    """
+    Returns a (max primary key, modification token) tuple which changes whenever
+    instances of model are created, saved or deleted.
+    """
+    token = cache.get(get_version_key(model))
+    if token is None:
+        # unknown or evicted, start a new version
+        token = uuid.uuid4().hex
+        if not cache.add(get_version_key(model), token, None):
+            token = cache.get(get_version_key(model), token)
+    max_pk = model._base_manager.using(using).aggregate(max_pk=Max("pk"))["max_pk"]
+    return max_pk, token
+
+
+def update_data_version(sender, **kwargs):
+    # raw saves of loaddata change the data as well
+    bump_data_version(sender)
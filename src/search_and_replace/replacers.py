@@ -0,0 +1,89 @@
+import re
+from functools import lru_cache
+
+
+class Replacer:
+    """
+    Replaces one or more (search, replace) pairs in a single pass over a value.
+    With regex=True the single search is a regular expression and replace may use
+    backreferences, see re.sub. ignore_case and whole_word apply to all pairs.
+    """
+
+    def __init__(self, pairs, regex=False, ignore_case=False, whole_word=False):
+        self.pairs = tuple(pairs)
+        self.regex = regex
+        flags = re.IGNORECASE if ignore_case else 0
+        if regex:
+            if len(self.pairs) != 1:
+                raise ValueError("Regular expressions can only be used as single pair")
+            ((search, self.replacement),) = self.pairs
+            self.pattern = re.compile(self.get_source(search, whole_word), flags)
+        elif len(self.pairs) > 1 or ignore_case or whole_word:
+            # prefer the longest term if several terms match at the same position
+            pairs = sorted(self.pairs, key=lambda pair: len(pair[0]), reverse=True)
+            # one group per term, the matched group (match.lastindex) is the term even if
+            # the matched text differs from it, e.g. in case
+            self.replacements = [None, *(replace for _, replace in pairs)]
+            self.pattern = re.compile(
+                self.get_source(
+                    "|".join("({})".format(re.escape(search)) for search, _ in pairs),
+                    whole_word,
+                ),
+                flags,
+            )
+        else:
+            self.pattern = None
+
+    def get_source(self, source, whole_word):
+        if whole_word:
+            return r"\b(?:{})\b".format(source)
+        return source
+
+    @property
+    def is_literal(self):
+        """
+        True if this replacer is a single plain text replacement.
+        """
+        return self.pattern is None
+
+    def search(self, value):
+        if self.pattern is None:
+            ((search, _),) = self.pairs
+            return search in value
+        return self.pattern.search(value) is not None
+
+    def iter_matches(self, value):
+        """
+        Yields (start, end, replacement) tuples for every occurrence in value.
+        """
+        if self.pattern is None:
+            ((search, replace),) = self.pairs
+            if not search:
+                return
+            start = value.find(search)
+            while start != -1:
+                yield start, start + len(search), replace
+                start = value.find(search, start + len(search))
+            return
+        for match in self.pattern.finditer(value):
+            if self.regex:
+                replacement = match.expand(self.replacement)
+            else:
+                replacement = self.replacements[match.lastindex]
+            yield match.start(), match.end(), replacement
+
+    def replace(self, value):
+        if self.pattern is None:
+            ((search, replace),) = self.pairs
+            return value.replace(search, replace)
+        if self.regex:
+            return self.pattern.sub(self.replacement, value)
+        return self.pattern.sub(lambda match: self.replacements[match.lastindex], value)
+
+
+@lru_cache(maxsize=128)
+def get_replacer(pairs, regex=False, ignore_case=False, whole_word=False):
+    """
+    Returns a Replacer for pairs, compiled patterns are cached between requests.
+    """
+    return Replacer(pairs, regex=regex, ignore_case=ignore_case, whole_word=whole_word)
@@ -0,0 +1,99 @@
+from django.db.backends.utils import truncate_name
+from django.db.models import Q
+
+from .paths import get_field_path
+
+
+class SearchBackend:
+    """
+    Builds the database filter used to find the rows containing a search term.
+    """
+
+    # matches the start or end of a word in the database's regular expressions
+    word_boundary = r"\b"
+
+    def __init__(self, connection):
+        self.connection = connection
+
+    def get_filter(self, search, fields):
+        filter = Q()
+        for field in fields:
+            filter |= Q(**{"{}__contains".format(field): search})
+        return filter
+
+    def get_ignore_case_filter(self, search, fields):
+        filter = Q()
+        for field in fields:
+            filter |= Q(**{"{}__icontains".format(field): search})
+        return filter
+
+    def get_regex_filter(self, pattern, fields, ignore_case=False):
+        lookup = "iregex" if ignore_case else "regex"
+        filter = Q()
+        for field in fields:
+            filter |= Q(**{"{}__{}".format(field, lookup): pattern})
+        return filter
+
+    def get_whole_word_pattern(self, pattern):
+        """
+        Returns a regular expression matching pattern only at word boundaries.
+        """
+        return "{0}(?:{1}){0}".format(self.word_boundary, pattern)
+
+    def get_index_statements(self, model, fields, ignore_case=False):
+        """
+        Returns the SQL statements creating the indexes recommended to search fields,
+        with ignore_case also the ones for case insensitive searches.
+        """
+        return []
+
+
+class TrigramSearchBackend(SearchBackend):
+    """
+    PostgreSQL can answer LIKE '%term%' queries using GIN indexes with the gin_trgm_ops
+    operator class of the pg_trgm extension, so the filter stays the same. Case
+    insensitive searches compare UPPER(column), which needs an expression index.
+    """
+
+    word_boundary = r"\y"
+
+    def get_index_name(self, model, column, suffix="trgm"):
+        return truncate_name(
+            "{}_{}_{}".format(model._meta.db_table, column, suffix),
+            self.connection.ops.max_name_length(),
+        )
+
+    def get_index_statements(self, model, fields, ignore_case=False):
+        quote_name = self.connection.ops.quote_name
+        statements = ["CREATE EXTENSION IF NOT EXISTS pg_trgm"]
+        for field in fields:
+            path = get_field_path(model, field)
+            if path.keys:
+                continue
+            # related fields are indexed on the table of their model
+            field_model = path.field.model
+            column = path.field.column
+            statements.append(
+                "CREATE INDEX CONCURRENTLY IF NOT EXISTS {} ON {} USING gin ({} gin_trgm_ops)".format(
+                    quote_name(self.get_index_name(field_model, column)),
+                    quote_name(field_model._meta.db_table),
+                    quote_name(column),
+                )
+            )
+            if ignore_case:
+                statements.append(
+                    "CREATE INDEX CONCURRENTLY IF NOT EXISTS {} ON {} USING gin "
+                    "(UPPER({}) gin_trgm_ops)".format(
+                        quote_name(self.get_index_name(field_model, column, "utrgm")),
+                        quote_name(field_model._meta.db_table),
+                        quote_name(column),
+                    )
+                )
+        return statements
+
+
+search_backends = {"postgresql": TrigramSearchBackend}
+
+
+def get_search_backend_class(connection):
+    return search_backends.get(connection.vendor, SearchBackend)
@@ -0,0 +1,211 @@
+from django.apps import apps
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.core.signals import setting_changed
+from django.db import models, router
+from django.db.models import Count, Q
+from django.db.models.functions import Cast
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .models import SearchAndReplaceIndexedField, SearchAndReplaceNgram
+from .paths import get_field_path, is_plain_text_field
+from .preview_cache import update_data_version
+
+NGRAM_SIZE = 3
+
+# {model: {field name, ...}} of the fields in the index
+_indexed_fields = {}
+
+
+def get_ngrams(value):
+    """
+    Returns the set of lower case n-grams of value.
+    """
+    value = value.lower()
+    return {value[i : i + NGRAM_SIZE] for i in range(len(value) - NGRAM_SIZE + 1)}
+
+
+def register_indexed_fields(model, fields):
+    """
+    Adds fields of model to the index, connecting the receivers that keep it up to date
+    for model only.
+    """
+    for field in fields:
+        if not get_field_path(model, field).is_plain or not is_plain_text_field(
+            model, field
+        ):
+            raise ImproperlyConfigured(
+                "{}.{} can't be indexed, only plain char and text fields can.".format(
+                    model._meta.label, field
+                )
+            )
+    indexed = _indexed_fields.get(model, set())
+    if indexed.issuperset(fields):
+        return
+    # receivers for all senders would disable fast deletes of every model, n-grams of
+    # instances deleted before are harmless, only the primary keys that exist are found
+    post_save.connect(
+        update_index, sender=model, dispatch_uid="search_and_replace_index"
+    )
+    post_delete.connect(
+        delete_from_index, sender=model, dispatch_uid="search_and_replace_index"
+    )
+    _indexed_fields[model] = indexed.union(fields)
+
+
+def clear_indexed_fields():
+    for model in _indexed_fields:
+        post_save.disconnect(sender=model, dispatch_uid="search_and_replace_index")
+        post_delete.disconnect(sender=model, dispatch_uid="search_and_replace_index")
+    _indexed_fields.clear()
+
+
+def register_settings_fields():
+    """
+    Registers the fields of the SEARCH_AND_REPLACE_INDEX setting, a
+    {"app_label.Model": [field name, ...]} dict. Called when the app is ready, so every
+    process saving the models keeps the index up to date.
+    """
+    for label, fields in getattr(settings, "SEARCH_AND_REPLACE_INDEX", {}).items():
+        register_indexed_fields(apps.get_model(label), fields)
+
+
+@receiver(setting_changed)
+def reload_indexed_fields(setting, **kwargs):
+    if setting == "SEARCH_AND_REPLACE_INDEX":
+        clear_indexed_fields()
+        register_settings_fields()
+
+
+def get_indexed_fields():
+    """
+    Returns a {model: {field name, ...}} dict of the fields registered for the index.
+    """
+    return _indexed_fields
+
+
+def get_indexed_value(instance, field):
+    value = getattr(instance, field)
+    # like SearchAndReplaceView.get_value, the raw text of markup fields
+    return getattr(value, "raw", value)
+
+
+def index_instances(model, instances, fields):
+    """
+    Replaces the n-grams of fields of instances in the index.
+    """
+    label = model._meta.label_lower
+    object_ids = [str(instance.pk) for instance in instances]
+    SearchAndReplaceNgram.objects.filter(
+        model=label, field__in=fields, object_id__in=object_ids
+    ).delete()
+    SearchAndReplaceNgram.objects.bulk_create(
+        [
+            SearchAndReplaceNgram(
+                model=label, field=field, object_id=object_id, ngram=ngram
+            )
+            for instance, object_id in zip(instances, object_ids)
+            for field in fields
+            for value in [get_indexed_value(instance, field)]
+            if isinstance(value, str)
+            for ngram in get_ngrams(value)
+        ],
+        batch_size=1000,
+    )
+
+
+def get_candidates(model, fields, term):
+    """
+    Returns a queryset of the primary keys of model whose fields contain all n-grams of
+    term in one of fields, None if term is too short to be looked up.
+    """
+    ngrams = get_ngrams(term)
+    if not ngrams:
+        return None
+    pk = model._meta.pk
+    return (
+        SearchAndReplaceNgram.objects.filter(
+            model=model._meta.label_lower, field__in=fields, ngram__in=ngrams
+        )
+        .values("object_id", "field")
+        .annotate(matched=Count("ngram"))
+        .filter(matched=len(ngrams))
+        .values_list(Cast("object_id", pk.target_field if pk.is_relation else pk))
+    )
+
+
+def get_new_rows_filter(model, fields):
+    """
+    Returns a Q object matching the rows of model created since the
+    search_and_replace_index command indexed fields, which may have been created without
+    post_save, e.g. by bulk_create(). None if fields weren't indexed or the rows can't
+    be told apart.
+    """
+    marks = list(
+        SearchAndReplaceIndexedField.objects.filter(
+            model=model._meta.label_lower, field__in=set(fields)
+        ).values_list("max_pk", flat=True)
+    )
+    pk = model._meta.pk
+    pk = pk.target_field if pk.is_relation else pk
+    # only automatically incremented primary keys tell the new rows
+    if len(marks) != len(set(fields)) or not isinstance(pk, models.AutoField):
+        return None
+    if not all(marks):
+        # a model without rows when the index was built
+        return None
+    return Q(pk__gt=min(pk.to_python(mark) for mark in marks))
+
+
+def get_candidate_filter(model, fields, terms):
+    """
+    Returns a Q object restricting model to the candidates of any of terms and the rows
+    created since the index was built, None if the index can't be used.
+    """
+    indexed = get_indexed_fields().get(model, ())
+    if not all(field in indexed for field in fields):
+        return None
+    filter = Q()
+    for term in terms:
+        candidates = get_candidates(model, fields, term)
+        if candidates is None:
+            return None
+        filter |= Q(pk__in=candidates)
+    new_rows = get_new_rows_filter(model, fields)
+    if new_rows is None:
+        return None
+    return filter | new_rows
+
+
+def update_index(sender, instance, update_fields=None, using=None, **kwargs):
+    fields = get_indexed_fields().get(sender)
+    # the index only covers the database chosen by the router, raw saves of loaddata
+    # are indexed as well
+    if not fields or using != router.db_for_write(sender, instance=instance):
+        return
+    if update_fields is not None:
+        fields = fields.intersection(update_fields)
+    if fields:
+        index_instances(sender, [instance], fields)
+
+
+def delete_from_index(sender, instance, using=None, **kwargs):
+    if using != router.db_for_write(sender, instance=instance):
+        return
+    SearchAndReplaceNgram.objects.filter(
+        model=sender._meta.label_lower, object_id=str(instance.pk)
+    ).delete()
+
+
+def has_other_receivers(signal, sender):
+    """
+    Like signal.has_listeners(sender), ignoring the receivers updating the index and the
+    data versions of the preview cache.
+    """
+    receivers = signal._live_receivers(sender)
+    if isinstance(receivers, tuple):  # sync and async receivers since Django 5.0
+        receivers = [*receivers[0], *receivers[1]]
+    return any(
+        receiver not in (update_index, update_data_version) for receiver in receivers
+    )
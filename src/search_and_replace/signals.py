@@ -0,0 +1,5 @@
+from django.dispatch import Signal
+
+# Sent after a model was searched (preview) or replaced (apply) with the arguments
+# view (the SearchAndReplaceView instance) and stats (a search_and_replace.stats.ModelStats).
+model_processed = Signal()
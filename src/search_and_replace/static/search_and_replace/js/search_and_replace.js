@@ -1,21 +1,45 @@
 window.addEventListener('load', function () {
     var search_and_replace = document.getElementById("search-and-replace");
 
+    var pairs_element = document.getElementById("search-and-replace-pairs");
+    var pairs = pairs_element === null ? [] : JSON.parse(pairs_element.textContent);
+
+    var ignore_case = Boolean(search_and_replace.dataset.ignoreCase);
+    var whole_word = Boolean(search_and_replace.dataset.wholeWord);
+
     var search = new Mark(document.querySelectorAll("td.search"));
-    search.mark(search_and_replace.dataset.search, {
-        separateWordSearch: false,
-        className: "mark-search",
-        caseSensitive: true,
-        diacritics: false
-    });
+    if (search_and_replace.dataset.regex) {
+        try {
+            var pattern = search_and_replace.dataset.search;
+            if (whole_word) {
+                pattern = "\\b(?:" + pattern + ")\\b";
+            }
+            search.markRegExp(new RegExp(pattern, ignore_case ? "gi" : "g"), {
+                className: "mark-search"
+            });
+        } catch (e) {
+            /* python only syntax, skip highlighting */
+        }
+    } else {
+        search.mark([search_and_replace.dataset.search].concat(pairs.map(function (pair) { return pair[0]; })), {
+            separateWordSearch: false,
+            className: "mark-search",
+            caseSensitive: !ignore_case,
+            accuracy: whole_word ? "exactly" : "partially",
+            diacritics: false
+        });
+    }
 
-    var replace = new Mark(document.querySelectorAll("td.replace"));
-    replace.mark(search_and_replace.dataset.replace, {
-        separateWordSearch: false,
-        className: "mark-replace",
-        caseSensitive: true,
-        diacritics: false
-    });
+    /* replacements of regular expressions may use backreferences, only highlight plain text */
+    if (!search_and_replace.dataset.regex) {
+        var replace = new Mark(document.querySelectorAll("td.replace"));
+        replace.mark([search_and_replace.dataset.replace].concat(pairs.map(function (pair) { return pair[1]; })), {
+            separateWordSearch: false,
+            className: "mark-replace",
+            caseSensitive: true,
+            diacritics: false
+        });
+    }
 
     /* remove apply button on input */
     function remove_apply_button() {
@@ -25,4 +49,33 @@ window.addEventListener('load', function () {
         }
     };
     document.querySelectorAll('form#search-and-replace input').forEach(function (elem) { elem.addEventListener('input', remove_apply_button)});
+
+    /* poll the progress of a running background job */
+    var job = document.getElementById("search-and-replace-job");
+    function update_job() {
+        var request = new XMLHttpRequest();
+        request.open("GET", job.dataset.url);
+        request.onload = function () {
+            if (request.status !== 200) {
+                return;
+            }
+            var data = JSON.parse(request.responseText);
+            job.querySelector(".job-status").textContent = data.status_display;
+            job.querySelector(".job-error").textContent = data.error;
+            var rows = job.querySelectorAll("tr");
+            data.models.forEach(function (progress, i) {
+                var row = rows[i + 1];
+                row.querySelector(".rows-scanned").textContent = progress.rows_scanned;
+                row.querySelector(".rows-changed").textContent = progress.rows_changed;
+                row.querySelector(".elapsed").textContent = progress.elapsed === null ? "" : progress.elapsed.toFixed(1);
+            });
+            if (data.status === "pending" || data.status === "running") {
+                window.setTimeout(update_job, 1000);
+            }
+        };
+        request.send();
+    }
+    if (job !== null && job.dataset.running) {
+        window.setTimeout(update_job, 1000);
+    }
 }, false);
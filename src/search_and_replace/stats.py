@@ -0,0 +1,73 @@
+import time
+from contextlib import ExitStack, contextmanager
+
+from django.db import connections
+
+PHASES = ("filter", "iterate", "replace", "save")
+
+
+class ModelStats:
+    """
+    Timings, query count and row counts of searching or replacing a single model.
+    """
+
+    def __init__(self, model, fields, preview, using=None):
+        self.model = model
+        self.fields = list(fields)
+        self.preview = preview
+        self.using = using
+        self.timings = dict.fromkeys(PHASES, 0.0)
+        self.queries = 0
+        self.rows_scanned = 0
+        self.rows_changed = 0
+
+    def __str__(self):
+        return "scanned={} changed={} queries={} {}".format(
+            self.rows_scanned,
+            self.rows_changed,
+            self.queries,
+            " ".join(
+                "{}={:.3f}s".format(phase, seconds)
+                for phase, seconds in self.timings.items()
+            ),
+        )
+
+    @property
+    def total_time(self):
+        return sum(self.timings.values())
+
+    @contextmanager
+    def timer(self, phase):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.timings[phase] += time.perf_counter() - start
+
+    def _count_query(self, execute, sql, params, many, context):
+        self.queries += 1
+        return execute(sql, params, many, context)
+
+    @contextmanager
+    def count_queries(self, aliases):
+        """
+        Counts the queries run on the given database aliases by the current thread.
+        """
+        with ExitStack() as stack:
+            for alias in aliases:
+                stack.enter_context(
+                    connections[alias].execute_wrapper(self._count_query)
+                )
+            yield
+
+    def as_dict(self):
+        return {
+            "model": self.model._meta.label_lower,
+            "fields": self.fields,
+            "preview": self.preview,
+            "database": self.using,
+            "timings": dict(self.timings),
+            "queries": self.queries,
+            "rows_scanned": self.rows_scanned,
+            "rows_changed": self.rows_changed,
+        }
@@ -1,14 +1,57 @@
+import asyncio
+import json
+import os
+import shutil
+import tempfile
+import threading
+from io import StringIO
+from unittest import mock
+
+from asgiref.sync import async_to_sync
 from django import forms
 from django.contrib import admin
+from django.contrib.messages import get_messages
 from django.contrib.messages.middleware import MessageMiddleware
 from django.contrib.sessions.middleware import SessionMiddleware
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.exceptions import ImproperlyConfigured
+from django.core.management.base import CommandError
 from django.urls import path
-from django.db import models
-from django.test import TestCase, RequestFactory
+from django.db import connection, models
+from django.db.models.options import Options
+from django.db.models import Q
+from django.db.models.signals import class_prepared, post_save
+from django.test import (
+    RequestFactory,
+    TestCase,
+    TransactionTestCase,
+    override_settings,
+)
+from django.test.utils import CaptureQueriesContext
 
+from search_and_replace.diffs import PreviewInstance, get_snippets
+from search_and_replace.discovery import get_views
+from search_and_replace.executors import ImmediateExecutor
 from search_and_replace.forms import SearchAndReplaceForm
-from search_and_replace.views import SearchAndReplaceView
-
+from search_and_replace.models import (
+    SearchAndReplaceIndexedField,
+    SearchAndReplaceJob,
+    SearchAndReplaceJobProgress,
+    SearchAndReplaceNgram,
+)
+from search_and_replace.preview_cache import get_data_version, get_versioned_models
+from search_and_replace.replacers import Replacer, get_replacer
+from search_and_replace.search_backends import SearchBackend, TrigramSearchBackend
+from search_and_replace.search_index import (
+    get_candidate_filter,
+    get_indexed_fields,
+    get_ngrams,
+    has_other_receivers,
+    register_indexed_fields,
+)
+from search_and_replace.signals import model_processed
+from search_and_replace.views import AsyncSearchAndReplaceView, SearchAndReplaceView
 
 urlpatterns = [path("admin/", admin.site.urls)]  # noqa, used for runtests.py
 
@@ -29,6 +72,31 @@ class Dog(models.Model):
         return self.name
 
 
+class Owner(models.Model):
+    name = models.CharField(max_length=255)
+    bio = models.TextField(verbose_name="Biography")
+    data = models.JSONField(default=dict)
+
+
+class Horse(models.Model):
+    name = models.CharField(max_length=255)
+    owner = models.ForeignKey(Owner, null=True, on_delete=models.CASCADE)
+
+    def __str__(self):
+        return self.name
+
+
+urlpatterns += [
+    path(
+        "search-and-replace/",
+        SearchAndReplaceView.as_view(
+            models_and_fields=[(Cat, ("name", "bio")), (Dog, ("name", "bark"))]
+        ),
+        name="search-and-replace",
+    )
+]
+
+
 class SearchAndReplaceFormTest(TestCase):
     def setUp(self):
         self.models_and_fields = [(Cat, ("name", "bio")), (Dog, ("name", "bark"))]
@@ -65,6 +133,22 @@ class SearchAndReplaceFormTest(TestCase):
         self.assertEqual(first.name, "extra_1")
         self.assertEqual(second.name, "extra_2")
 
+    def test_field_descriptors_are_cached_per_configuration(self):
+        with mock.patch.object(Options, "get_field") as get_field:
+            form = SearchAndReplaceForm(self.models_and_fields)
+        get_field.assert_not_called()
+
+        (cat, (name, bio)), _ = form.get_field_descriptors()
+        self.assertEqual(bio.form_field_name, "search_and_replace_cat_bio")
+        self.assertEqual(bio.label, "Biography")
+
+        class_prepared.send(sender=Cat)
+        with mock.patch.object(
+            Options, "get_field", wraps=Cat._meta.get_field
+        ) as get_field:
+            SearchAndReplaceForm([(Cat, ("bio",))])
+        self.assertTrue(get_field.called)
+
     def test_get_selected_fields(self):
         form = SearchAndReplaceForm(
             self.models_and_fields,
@@ -361,3 +445,1511 @@ class SearchAndReplaceViewTest(TestCase):
 
         self.lucy.refresh_from_db()
         self.assertEqual(self.lucy.name, "Lucy Lucy")
+
+    def test_database_replace_uses_a_single_update_per_model(self):
+        request = RequestFactory().post(
+            "/",
+            {
+                "search": "the",
+                "replace": "teh",
+                "search_and_replace_dog_bark": "true",
+                "search_and_replace_dog_name": "true",
+                "search_and_replace_cat_bio": "true",
+                "search_and_replace_cat_name": "true",
+                "apply": "true",
+                "preview_id": "an-id-used-for-database-replace",
+            },
+        )
+        SessionMiddleware().process_request(request)
+        MessageMiddleware().process_request(request)
+
+        with self.assertNumQueries(2):
+            SearchAndReplaceView.as_view(
+                models_and_fields=self.models_and_fields, database_replace=True
+            )(request)
+
+        self.lucy.refresh_from_db()
+        self.momo.refresh_from_db()
+        self.adam.refresh_from_db()
+
+        self.assertEqual(self.lucy.bio, "Grew up in teh deep south.")
+        self.assertEqual(self.momo.name, "Momo teh first.")
+        self.assertEqual(self.adam.bark, "Whef, teh whef!")
+
+    def test_database_replace_falls_back_to_save_for_models_with_receivers(self):
+        saved = []
+
+        def receiver(sender, instance, **kwargs):
+            saved.append(instance.pk)
+
+        post_save.connect(receiver, sender=Dog)
+        self.addCleanup(post_save.disconnect, receiver, sender=Dog)
+
+        request = RequestFactory().post(
+            "/",
+            {
+                "search": "the",
+                "replace": "teh",
+                "search_and_replace_dog_bark": "true",
+                "search_and_replace_cat_bio": "true",
+                "apply": "true",
+                "preview_id": "an-id-used-for-database-replace-fallback",
+            },
+        )
+        SessionMiddleware().process_request(request)
+        MessageMiddleware().process_request(request)
+
+        SearchAndReplaceView.as_view(
+            models_and_fields=self.models_and_fields, database_replace=True
+        )(request)
+
+        self.lucy.refresh_from_db()
+        self.adam.refresh_from_db()
+
+        self.assertEqual(self.lucy.bio, "Grew up in teh deep south.")
+        self.assertEqual(self.adam.bark, "Whef, teh whef!")
+        self.assertEqual(saved, [self.adam.pk])
+
+    def test_replace_writes_changed_instances_in_batches(self):
+        request = RequestFactory().post(
+            "/",
+            {
+                "search": "the",
+                "replace": "teh",
+                "search_and_replace_cat_bio": "true",
+                "search_and_replace_cat_name": "true",
+                "apply": "true",
+                "preview_id": "an-id-used-for-batched-updates",
+            },
+        )
+        SessionMiddleware().process_request(request)
+        MessageMiddleware().process_request(request)
+
+        with CaptureQueriesContext(connection) as queries:
+            SearchAndReplaceView.as_view(
+                models_and_fields=self.models_and_fields, batch_size=2
+            )(request)
+
+        updates = [q["sql"] for q in queries if q["sql"].startswith("UPDATE")]
+        self.assertEqual(len(updates), 2)
+
+        self.lucy.refresh_from_db()
+        self.peter.refresh_from_db()
+        self.momo.refresh_from_db()
+
+        self.assertEqual(self.lucy.bio, "Grew up in teh deep south.")
+        self.assertEqual(self.peter.bio, "Child of teh north.")
+        self.assertEqual(self.momo.name, "Momo teh first.")
+
+    def test_replace_saves_only_changed_fields_for_models_with_receivers(self):
+        update_fields = []
+
+        def receiver(sender, instance, **kwargs):
+            update_fields.append(kwargs["update_fields"])
+
+        post_save.connect(receiver, sender=Cat)
+        self.addCleanup(post_save.disconnect, receiver, sender=Cat)
+
+        request = RequestFactory().post(
+            "/",
+            {
+                "search": "the",
+                "replace": "teh",
+                "search_and_replace_cat_bio": "true",
+                "search_and_replace_cat_name": "true",
+                "apply": "true",
+                "preview_id": "an-id-used-for-update-fields",
+            },
+        )
+        SessionMiddleware().process_request(request)
+        MessageMiddleware().process_request(request)
+
+        SearchAndReplaceView.as_view(models_and_fields=self.models_and_fields)(request)
+
+        self.assertEqual(
+            sorted(update_fields, key=sorted),
+            [frozenset(["bio"]), frozenset(["bio"]), frozenset(["name"])],
+        )
+
+    def test_iter_batches_uses_keyset_pagination(self):
+        view = SearchAndReplaceView(models_and_fields=self.models_and_fields)
+        view.batch_size = 2
+
+        with self.assertNumQueries(2):
+            batches = list(view.iter_batches(Cat.objects.all()))
+
+        self.assertEqual(batches, [[self.lucy, self.peter], [self.momo]])
+
+    def test_apply_returns_the_number_of_changed_instances(self):
+        view = SearchAndReplaceView(models_and_fields=self.models_and_fields)
+        view.batch_size = 2
+
+        count = view.apply_search_and_replace(
+            "the", "teh", Cat, ["name", "bio"], preview=False
+        )
+
+        self.assertEqual(count, 3)
+
+    def test_preview_is_paginated_per_model(self):
+        data = {
+            "search": "the",
+            "replace": "teh",
+            "search_and_replace_dog_bark": "true",
+            "search_and_replace_cat_bio": "true",
+            "search_and_replace_cat_name": "true",
+        }
+        view = SearchAndReplaceView.as_view(
+            models_and_fields=self.models_and_fields, preview_page_size=2
+        )
+
+        response = view(RequestFactory().post("/", data))
+        self.assertContains(response, "Lucy")
+        self.assertContains(response, "Peter")
+        self.assertContains(response, "Adam")
+        self.assertNotContains(response, "Momo")
+        self.assertContains(response, "Showing 4 results")
+
+        response = view(
+            RequestFactory().post(
+                "/", dict(data, page_search_and_replace_cat=["1", "2"])
+            )
+        )
+        self.assertNotContains(response, "Lucy")
+        self.assertNotContains(response, "Peter")
+        self.assertContains(response, "Momo")
+        self.assertContains(response, "Adam")
+        self.assertContains(response, "Showing 4 results")
+
+    def test_stream_preview(self):
+        data = {
+            "search": "the",
+            "replace": "teh",
+            "search_and_replace_dog_bark": "true",
+            "search_and_replace_cat_bio": "true",
+            "search_and_replace_cat_name": "true",
+        }
+        response = SearchAndReplaceView.as_view(
+            models_and_fields=self.models_and_fields,
+            preview_page_size=2,
+            stream_preview=True,
+        )(RequestFactory().post("/", data))
+        self.assertTrue(response.streaming)
+
+        chunks = iter(response.streaming_content)
+        with self.assertNumQueries(0):
+            head = next(chunks).decode()
+        self.assertIn('name="preview_id" value="', head)
+        self.assertIn('id="search-and-replace-apply"', head)
+        self.assertNotIn("Lucy", head)
+
+        cats, dogs, tail = [chunk.decode() for chunk in chunks]
+        self.assertIn("Lucy", cats)
+        self.assertIn(
+            '<input type="hidden" form="search-and-replace" '
+            'name="page_search_and_replace_cat" value="1"/>',
+            cats,
+        )
+        self.assertNotIn("Adam", cats)
+        self.assertIn("Adam", dogs)
+        self.assertIn("Showing 4 results", tail)
+        self.assertTrue(tail.rstrip().endswith("</html>"))
+
+    def stream_with_templates(self, templates):
+        loaders = [
+            ("django.template.loaders.locmem.Loader", templates),
+            "django.template.loaders.app_directories.Loader",
+        ]
+        engine = {
+            "BACKEND": "django.template.backends.django.DjangoTemplates",
+            "OPTIONS": {"loaders": loaders},
+        }
+        with self.settings(TEMPLATES=[engine]):
+            response = SearchAndReplaceView.as_view(
+                models_and_fields=self.models_and_fields,
+                template_name="custom.html",
+                stream_preview=True,
+            )(
+                RequestFactory().post(
+                    "/",
+                    {
+                        "search": "the",
+                        "replace": "teh",
+                        "search_and_replace_cat_bio": "true",
+                    },
+                )
+            )
+            return [chunk.decode() for chunk in response.streaming_content]
+
+    def test_stream_preview_renders_overridden_blocks(self):
+        template = (
+            '{% extends "search_and_replace/search_and_replace.html" %}'
+            "{% block table_row %}<tr><td>custom {{ instance }}</td></tr>{% endblock %}"
+        )
+        head, cats, tail = self.stream_with_templates({"custom.html": template})
+        self.assertIn("<td>custom Lucy</td>", cats)
+        self.assertNotIn("<html", cats)
+        self.assertIn("Showing 2 results", tail)
+
+    def test_stream_preview_requires_the_markers(self):
+        template = '{% extends "search_and_replace/search_and_replace.html" %}'
+        template += "{% block results %}{% endblock %}"
+        with self.assertRaises(ImproperlyConfigured):
+            self.stream_with_templates({"custom.html": template})
+
+    def test_apply_loads_only_the_selected_fields(self):
+        view = SearchAndReplaceView(models_and_fields=self.models_and_fields)
+
+        with CaptureQueriesContext(connection) as queries:
+            view.apply_search_and_replace("the", "teh", Cat, ["name"], preview=False)
+
+        select = next(q["sql"] for q in queries if q["sql"].startswith("SELECT"))
+        self.assertNotIn('"bio"', select.split("WHERE")[0])
+
+        self.momo.refresh_from_db()
+        self.assertEqual(self.momo.name, "Momo teh first.")
+
+    def test_apply_loads_and_writes_every_batch_in_its_own_transaction(self):
+        view = SearchAndReplaceView(models_and_fields=self.models_and_fields)
+        view.batch_size = 2
+
+        with CaptureQueriesContext(connection) as queries:
+            view.apply_search_and_replace("the", "teh", Cat, ["bio"], preview=False)
+
+        statements = [q["sql"].split()[0] for q in queries]
+        self.assertEqual(
+            statements,
+            ["SAVEPOINT", "SELECT", "UPDATE", "RELEASE"]
+            + ["SAVEPOINT", "SELECT", "RELEASE"],
+        )
+
+    def test_apply_locks_rows_and_sleeps_between_batches(self):
+        view = SearchAndReplaceView(models_and_fields=self.models_and_fields)
+        view.batch_size = 2
+        view.select_for_update = True
+        view.throttle = 0.5
+
+        qs = view.get_instances("the", Cat, ["name", "bio"], preview=False)
+        self.assertTrue(qs.query.select_for_update)
+        qs = view.get_instances("the", Cat, ["name", "bio"], preview=True)
+        self.assertFalse(qs.query.select_for_update)
+
+        with mock.patch("search_and_replace.views.time.sleep") as sleep:
+            count = view.apply_search_and_replace(
+                "the", "teh", Cat, ["name", "bio"], preview=False
+            )
+
+        self.assertEqual(count, 3)
+        sleep.assert_called_once_with(0.5)
+
+    def test_count_matches_in_the_database(self):
+        Cat.objects.create(name="Leo", bio="the north and the south")
+        view = SearchAndReplaceView(models_and_fields=self.models_and_fields)
+
+        with self.assertNumQueries(1):
+            count = view.count_matches("the", Cat, ["name", "bio"])
+
+        self.assertEqual(count, {"rows": 4, "fields": [("name", 1, 1), ("bio", 3, 4)]})
+
+        view.replace_options = {"regex": True, "pairs": ()}
+        count = view.count_matches("th+e", Cat, ["name", "bio"])
+        self.assertEqual(
+            count, {"rows": 4, "fields": [("name", 1, None), ("bio", 3, None)]}
+        )
+
+    def test_statistics_render_counts_without_preview(self):
+        request = RequestFactory().post(
+            "/",
+            {
+                "search": "the",
+                "replace": "teh",
+                "search_and_replace_cat_bio": "true",
+                "search_and_replace_dog_bark": "true",
+                "statistics": "true",
+            },
+        )
+
+        response = SearchAndReplaceView.as_view(
+            models_and_fields=self.models_and_fields
+        )(request)
+
+        self.assertContains(response, '<td class="rows">2</td>', html=True)
+        self.assertContains(response, '<td class="occurrences">1</td>', html=True)
+        self.assertContains(response, "Showing 3 results")
+        self.assertNotContains(response, "Lucy")
+        self.assertNotContains(response, "preview_id")
+
+    def test_preview_loads_only_the_selected_and_preview_fields(self):
+        class View(SearchAndReplaceView):
+            def get_preview_fields(self, model):
+                return ["name"]
+
+        request = RequestFactory().post(
+            "/",
+            {"search": "the", "replace": "teh", "search_and_replace_dog_bark": "true"},
+        )
+
+        with CaptureQueriesContext(connection) as queries:
+            response = View.as_view(models_and_fields=self.models_and_fields)(request)
+
+        self.assertContains(response, "Adam")
+        self.assertEqual(len(queries), 2)
+        self.assertEqual(
+            queries[1]["sql"].split("FROM")[0],
+            'SELECT "search_and_replace_dog"."id", "search_and_replace_dog"."name", '
+            '"search_and_replace_dog"."bark" ',
+        )
+
+
+class SearchAndReplaceJobTest(TestCase):
+    def setUp(self):
+        self.models_and_fields = [(Cat, ("name", "bio")), (Dog, ("name", "bark"))]
+
+        self.lucy = Cat.objects.create(name="Lucy", bio="Grew up in the deep south.")
+        self.peter = Cat.objects.create(name="Peter", bio="Child of the north.")
+        self.adam = Dog.objects.create(name="Adam", bark="Whef, the whef!")
+
+    def test_apply_in_background_job(self):
+        request = RequestFactory().post(
+            "/",
+            {
+                "search": "the",
+                "replace": "teh",
+                "search_and_replace_dog_bark": "true",
+                "search_and_replace_cat_bio": "true",
+                "apply": "true",
+                "preview_id": "an-id-used-for-a-background-job",
+            },
+        )
+        SessionMiddleware().process_request(request)
+        MessageMiddleware().process_request(request)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            response = SearchAndReplaceView.as_view(
+                models_and_fields=self.models_and_fields,
+                background=True,
+                executor=ImmediateExecutor(),
+            )(request)
+
+        job = SearchAndReplaceJob.objects.get()
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(response["Location"], "?job={}".format(job.pk))
+        self.assertEqual(job.status, SearchAndReplaceJob.DONE)
+
+        cat_progress, dog_progress = job.progress.all()
+        self.assertEqual(cat_progress.model, "search_and_replace.cat")
+        self.assertEqual(cat_progress.rows_scanned, 2)
+        self.assertEqual(cat_progress.rows_changed, 2)
+        self.assertEqual(dog_progress.rows_changed, 1)
+
+        self.lucy.refresh_from_db()
+        self.adam.refresh_from_db()
+        self.assertEqual(self.lucy.bio, "Grew up in teh deep south.")
+        self.assertEqual(self.adam.bark, "Whef, teh whef!")
+
+    def test_undo_log_reverts_the_job(self):
+        request = RequestFactory().post(
+            "/",
+            {
+                "search": "the",
+                "replace": "teh",
+                "search_and_replace_dog_bark": "true",
+                "search_and_replace_cat_bio": "true",
+                "apply": "true",
+                "preview_id": "an-id-used-for-the-undo-log",
+            },
+        )
+        SessionMiddleware().process_request(request)
+        MessageMiddleware().process_request(request)
+
+        response = SearchAndReplaceView.as_view(
+            models_and_fields=self.models_and_fields, undo_log=True, batch_size=1
+        )(request)
+
+        self.assertEqual(response.status_code, 302)
+        job = SearchAndReplaceJob.objects.get()
+        self.assertEqual(job.status, SearchAndReplaceJob.DONE)
+        self.assertEqual(
+            sorted(job.changes.values_list("model", "object_id", "field", "old_value")),
+            [
+                ("search_and_replace.cat", str(self.lucy.pk), "bio", self.lucy.bio),
+                ("search_and_replace.cat", str(self.peter.pk), "bio", self.peter.bio),
+                ("search_and_replace.dog", str(self.adam.pk), "bark", self.adam.bark),
+            ],
+        )
+        self.lucy.refresh_from_db()
+        self.assertEqual(self.lucy.bio, "Grew up in teh deep south.")
+
+        self.peter.delete()
+        view = SearchAndReplaceView(batch_size=2)
+        # the distinct models, then one batch of changes, instances and update per model
+        # and the empty batches ending them, every batch in a savepoint, and the job
+        with self.assertNumQueries(1 + 5 + 3 + 5 + 2 + 1):
+            self.assertEqual(view.revert_job(job), 2)
+        self.assertEqual(view.skipped_changes, 0)
+
+        self.lucy.refresh_from_db()
+        self.adam.refresh_from_db()
+        self.assertEqual(self.lucy.bio, "Grew up in the deep south.")
+        self.assertEqual(self.adam.bark, "Whef, the whef!")
+
+        # values changed after the job are kept
+        Cat.objects.filter(pk=self.lucy.pk).update(bio="Grew up in teh deep south.")
+        Dog.objects.filter(pk=self.adam.pk).update(bark="Woof!")
+        self.assertEqual(view.revert_job(job), 1)
+        self.assertEqual(view.skipped_changes, 1)
+        self.lucy.refresh_from_db()
+        self.adam.refresh_from_db()
+        self.assertEqual(self.lucy.bio, "Grew up in the deep south.")
+        self.assertEqual(self.adam.bark, "Woof!")
+        job.refresh_from_db()
+        self.assertIsNotNone(job.reverted)
+
+    def test_admin_reverts_finished_jobs_once(self):
+        Cat.objects.filter(pk=self.lucy.pk).update(bio="Grew up in teh deep south.")
+        job = SearchAndReplaceJob.objects.create(
+            search="the", replace="teh", status=SearchAndReplaceJob.DONE
+        )
+        job.changes.create(
+            model="search_and_replace.cat",
+            object_id=str(self.lucy.pk),
+            field="bio",
+            old_value="Grew up in the deep south.",
+        )
+        # peter was edited after the job wrote "Child of teh north."
+        job.changes.create(
+            model="search_and_replace.cat",
+            object_id=str(self.peter.pk),
+            field="bio",
+            old_value="Child of the north.",
+            new_value_checksum=SearchAndReplaceView().get_checksum(
+                ["Child of teh north."]
+            ),
+        )
+        running = SearchAndReplaceJob.objects.create(
+            search="the", replace="teh", status=SearchAndReplaceJob.RUNNING
+        )
+        model_admin = admin.site._registry[SearchAndReplaceJob]
+
+        request = RequestFactory().post("/")
+        request.user = mock.Mock(
+            has_perm=lambda perm: perm
+            != "search_and_replace.change_searchandreplacejob"
+        )
+        self.assertNotIn("revert", model_admin.get_actions(request))
+
+        request.user = mock.Mock(has_perm=lambda perm: True)
+        SessionMiddleware().process_request(request)
+        MessageMiddleware().process_request(request)
+        self.assertIn("revert", model_admin.get_actions(request))
+        model_admin.revert(request, SearchAndReplaceJob.objects.order_by("pk"))
+        model_admin.revert(request, SearchAndReplaceJob.objects.filter(pk=job.pk))
+
+        self.lucy.refresh_from_db()
+        self.assertEqual(self.lucy.bio, "Grew up in the deep south.")
+        running.refresh_from_db()
+        self.assertIsNone(running.reverted)
+        self.assertEqual(
+            [str(message) for message in get_messages(request)],
+            [
+                "Restored 1 values replaced by {}".format(job),
+                "Skipped 1 values changed since {}".format(job),
+                "{} is still running or was reverted already".format(running),
+                "{} is still running or was reverted already".format(job),
+            ],
+        )
+
+    def test_job_progress(self):
+        job = SearchAndReplaceJob.objects.create(search="the", replace="teh")
+        SearchAndReplaceJobProgress.objects.create(
+            job=job, position=0, model="search_and_replace.cat", fields="bio"
+        )
+        view = SearchAndReplaceView.as_view(models_and_fields=self.models_and_fields)
+
+        response = view(RequestFactory().get("/", {"job": job.pk}))
+        self.assertContains(response, "search-and-replace-job")
+        self.assertContains(response, "search_and_replace.cat")
+
+        response = view(RequestFactory().get("/", {"job": job.pk, "format": "json"}))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            json.loads(response.content.decode())["models"],
+            [
+                {
+                    "model": "search_and_replace.cat",
+                    "fields": ["bio"],
+                    "rows_scanned": 0,
+                    "rows_changed": 0,
+                    "elapsed": None,
+                    "finished": False,
+                }
+            ],
+        )
+
+
+class ConcurrentSearchAndReplaceViewTest(TransactionTestCase):
+    def setUp(self):
+        self.models_and_fields = [(Cat, ("name", "bio")), (Dog, ("name", "bark"))]
+
+        Cat.objects.create(name="Lucy", bio="Grew up in the deep south.")
+        Cat.objects.create(name="Momo the first.", bio="You know me.")
+        Dog.objects.create(name="Adam", bark="Whef, the whef!")
+
+    def test_preview_with_concurrent_workers_keeps_the_model_order(self):
+        data = {
+            "search": "the",
+            "replace": "teh",
+            "search_and_replace_dog_bark": "true",
+            "search_and_replace_cat_bio": "true",
+            "search_and_replace_cat_name": "true",
+        }
+
+        results = []
+        for max_workers in (1, 2):
+            view = SearchAndReplaceView(
+                models_and_fields=self.models_and_fields, max_workers=max_workers
+            )
+            view.request = RequestFactory().post("/", data)
+            view.form = view.get_form(view.request)
+            assert view.form.is_valid()
+            results.append(
+                [
+                    (model, [str(instance) for instance, changes in page])
+                    for model, page in view.get_results("the", "teh")
+                ]
+            )
+
+        self.assertEqual(results[0], results[1])
+        self.assertEqual(
+            results[1], [(Cat, ["Lucy", "Momo teh first."]), (Dog, ["Adam"])]
+        )
+
+    def test_async_view_searches_models_concurrently(self):
+        view = AsyncSearchAndReplaceView.as_view(
+            models_and_fields=self.models_and_fields, stream_preview=True
+        )
+        self.assertTrue(asyncio.iscoroutinefunction(view))
+
+        # both models have to be searched at the same time to pass the barrier
+        barrier = threading.Barrier(2, timeout=5)
+        apply_search_and_replace = AsyncSearchAndReplaceView.apply_search_and_replace
+
+        def apply(self, *args, **kwargs):
+            barrier.wait()
+            return apply_search_and_replace(self, *args, **kwargs)
+
+        with mock.patch.object(
+            AsyncSearchAndReplaceView, "apply_search_and_replace", apply
+        ):
+            response = async_to_sync(view)(
+                RequestFactory().post(
+                    "/",
+                    {
+                        "search": "the",
+                        "replace": "teh",
+                        "search_and_replace_dog_bark": "true",
+                        "search_and_replace_cat_bio": "true",
+                    },
+                )
+            )
+        self.assertContains(response, "Grew up in teh deep south.")
+        self.assertContains(response, "Whef, teh whef!")
+        self.assertContains(response, "Showing 2 results")
+        self.assertFalse(response.streaming)
+
+        response = async_to_sync(view)(RequestFactory().get("/"))
+        self.assertContains(response, "search_and_replace_dog_bark")
+
+    def test_async_view_other_methods(self):
+        view = AsyncSearchAndReplaceView.as_view(
+            models_and_fields=self.models_and_fields
+        )
+        self.assertEqual(
+            async_to_sync(view)(RequestFactory().put("/")).status_code, 405
+        )
+        response = async_to_sync(view)(RequestFactory().options("/"))
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("POST", response["Allow"])
+
+
+class SearchBackendTest(TestCase):
+    def test_get_views_finds_the_configured_views(self):
+        ((name, view),) = get_views()
+        self.assertEqual(name, "search-and-replace")
+        self.assertEqual(
+            view.models_and_fields, [(Cat, ("name", "bio")), (Dog, ("name", "bark"))]
+        )
+
+    def test_default_backend_does_not_recommend_indexes(self):
+        self.assertEqual(
+            SearchBackend(connection).get_index_statements(Cat, ["bio"]), []
+        )
+
+        out = StringIO()
+        call_command("search_and_replace_indexes", "--sql", stdout=out)
+        self.assertEqual(
+            out.getvalue(), "No indexes recommended for the configured databases.\n"
+        )
+
+    def test_trigram_backend_recommends_trigram_indexes(self):
+        self.assertEqual(
+            TrigramSearchBackend(connection).get_index_statements(Cat, ["name", "bio"]),
+            [
+                "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+                'CREATE INDEX CONCURRENTLY IF NOT EXISTS "search_and_replace_cat_name_trgm" '
+                'ON "search_and_replace_cat" USING gin ("name" gin_trgm_ops)',
+                'CREATE INDEX CONCURRENTLY IF NOT EXISTS "search_and_replace_cat_bio_trgm" '
+                'ON "search_and_replace_cat" USING gin ("bio" gin_trgm_ops)',
+            ],
+        )
+
+    def test_view_uses_the_configured_search_backend(self):
+        class StartsWithSearchBackend(SearchBackend):
+            def get_filter(self, search, fields):
+                return Q(**{"{}__startswith".format(fields[0]): search})
+
+        Cat.objects.create(name="Lucy", bio="Lucy is a cat.")
+        Cat.objects.create(name="Peter", bio="Peter likes Lucy.")
+        view = SearchAndReplaceView(search_backend=StartsWithSearchBackend)
+
+        self.assertEqual(
+            [cat.name for cat in view.filter_qs("Lucy", Cat, ["bio"])], ["Lucy"]
+        )
+
+
+class ReplacerTest(TestCase):
+    def test_literal_replacer(self):
+        replacer = Replacer((("the", "teh"),))
+        self.assertTrue(replacer.is_literal)
+        self.assertTrue(replacer.search("in the south"))
+        self.assertFalse(replacer.search("in The south"))
+        self.assertEqual(replacer.replace("the the"), "teh teh")
+
+    def test_multiple_pairs_are_replaced_in_a_single_pass(self):
+        replacer = Replacer((("cat", "dog"), ("dog", "cat"), ("doghouse", "house")))
+        self.assertFalse(replacer.is_literal)
+        self.assertTrue(replacer.search("a dog"))
+        self.assertEqual(
+            replacer.replace("cat and dog in the doghouse"),
+            "dog and cat in the house",
+        )
+
+    def test_regex_replacer(self):
+        replacer = Replacer(((r"(\w+)@example\.com", r"\1@example.org"),), regex=True)
+        self.assertTrue(replacer.search("mail lucy@example.com"))
+        self.assertEqual(
+            replacer.replace("mail lucy@example.com"), "mail lucy@example.org"
+        )
+
+    def test_ignore_case_and_whole_word_replacer(self):
+        replacer = Replacer((("the", "a"), ("North", "south")), ignore_case=True)
+        self.assertFalse(replacer.is_literal)
+        self.assertEqual(replacer.replace("The NORTH then"), "a south an")
+
+        # matched text differing from the term, pairs differing only in case
+        replacer = Replacer((("s", "x"),), ignore_case=True)
+        self.assertEqual(replacer.replace("\u017fun"), "xun")
+        replacer = Replacer((("foo", "b"), ("Foo", "A")))
+        self.assertEqual(replacer.replace("foo Foo"), "b A")
+
+        replacer = Replacer((("the", "a"),), whole_word=True)
+        self.assertFalse(replacer.search("then there"))
+        self.assertEqual(replacer.replace("the then, the."), "a then, a.")
+
+        replacer = Replacer(((r"th\w", "a"),), regex=True, whole_word=True)
+        self.assertEqual(replacer.replace("the then"), "a then")
+
+    def test_iter_matches(self):
+        self.assertEqual(
+            list(Replacer([("the", "teh")]).iter_matches("the then")),
+            [(0, 3, "teh"), (4, 7, "teh")],
+        )
+        self.assertEqual(
+            list(Replacer([(r"(\w+)@", r"\1 at ")], regex=True).iter_matches("a@b")),
+            [(0, 2, "a at ")],
+        )
+
+    def test_snippets_show_the_context_of_occurrences(self):
+        value = "{}the north{}the south{}and the west".format(
+            "x" * 100, "y" * 5, "z" * 100
+        )
+        snippets = get_snippets(
+            value, Replacer([("the", "teh")]).iter_matches(value), context_size=10
+        )
+
+        self.assertEqual(
+            [(s.old, s.new, s.truncated_start, s.truncated_end) for s in snippets],
+            [
+                (
+                    "xxxxxxxxxxthe northyyyyythe southzzzz",
+                    "xxxxxxxxxxteh northyyyyyteh southzzzz",
+                    True,
+                    True,
+                ),
+                ("zzzzzzand the west", "zzzzzzand teh west", True, False),
+            ],
+        )
+
+    def test_get_replacer_caches_compiled_patterns(self):
+        pairs = (("cat", "dog"), ("dog", "cat"))
+        self.assertIs(get_replacer(pairs), get_replacer(pairs))
+        self.assertIsNot(get_replacer(pairs[:1]), get_replacer(pairs[:1], regex=True))
+
+
+class ReplaceOptionsTest(TestCase):
+    def setUp(self):
+        self.models_and_fields = [(Cat, ("name", "bio")), (Dog, ("name", "bark"))]
+
+        self.lucy = Cat.objects.create(name="Lucy", bio="Grew up in the deep south.")
+        self.peter = Cat.objects.create(name="Peter", bio="Child of the north.")
+        self.adam = Dog.objects.create(name="Adam", bark="Whef, the whef!")
+
+    def post(self, data, **initkwargs):
+        request = RequestFactory().post("/", data)
+        SessionMiddleware().process_request(request)
+        MessageMiddleware().process_request(request)
+        return SearchAndReplaceView.as_view(
+            models_and_fields=self.models_and_fields, **initkwargs
+        )(request)
+
+    def test_apply_multiple_pairs(self):
+        self.post(
+            {
+                "search": "south",
+                "replace": "north",
+                "pairs": "north => south\nwhef => wuff",
+                "search_and_replace_cat_bio": "true",
+                "search_and_replace_dog_bark": "true",
+                "apply": "true",
+                "preview_id": "an-id-used-for-multiple-pairs",
+            },
+            database_replace=True,
+        )
+
+        self.lucy.refresh_from_db()
+        self.peter.refresh_from_db()
+        self.adam.refresh_from_db()
+        self.assertEqual(self.lucy.bio, "Grew up in the deep north.")
+        self.assertEqual(self.peter.bio, "Child of the south.")
+        self.assertEqual(self.adam.bark, "Whef, the wuff!")
+
+    def test_preview_regex(self):
+        response = self.post(
+            {
+                "search": r"the (\w+)",
+                "replace": r"the very \1",
+                "regex": "true",
+                "search_and_replace_cat_bio": "true",
+            }
+        )
+        self.assertContains(response, "Grew up in the very deep south.")
+        self.assertContains(response, "Child of the very north.")
+
+    def test_apply_regex(self):
+        self.post(
+            {
+                "search": r"^(\w+)$",
+                "replace": r"\1 the cat",
+                "regex": "true",
+                "search_and_replace_cat_name": "true",
+                "apply": "true",
+                "preview_id": "an-id-used-for-regex",
+            }
+        )
+
+        self.lucy.refresh_from_db()
+        self.assertEqual(self.lucy.name, "Lucy the cat")
+
+    def test_apply_ignore_case_and_whole_word(self):
+        Cat.objects.create(name="Theo", bio="The cat likes THE other cats.")
+        data = {
+            "search": "the",
+            "replace": "a",
+            "ignore_case": "true",
+            "whole_word": "true",
+            "search_and_replace_cat_name": "true",
+            "search_and_replace_cat_bio": "true",
+        }
+        view = SearchAndReplaceView(models_and_fields=self.models_and_fields)
+        view.replace_options = {"ignore_case": True, "whole_word": True}
+        self.assertEqual(
+            sorted(
+                view.filter_qs("the", Cat, ["name", "bio"]).values_list(
+                    "name", flat=True
+                )
+            ),
+            ["Lucy", "Peter", "Theo"],
+        )
+        self.assertEqual(
+            view.filter_qs("the", Cat, ["name"]).count(), 0, "Theo is not a whole word"
+        )
+
+        self.post(dict(data, apply="true", preview_id="an-id-used-for-whole-words"))
+
+        self.assertEqual(
+            sorted(Cat.objects.values_list("name", "bio")),
+            [
+                ("Lucy", "Grew up in a deep south."),
+                ("Peter", "Child of a north."),
+                ("Theo", "a cat likes a other cats."),
+            ],
+        )
+
+    def test_count_ignore_case(self):
+        Cat.objects.create(name="Theo", bio="The cat likes THE other cats.")
+        view = SearchAndReplaceView(models_and_fields=self.models_and_fields)
+        view.replace_options = {"ignore_case": True}
+        self.assertEqual(
+            view.count_matches("the", Cat, ["bio"]),
+            {"rows": 3, "fields": [("bio", 3, 5)]},
+        )
+
+        view.replace_options = {"ignore_case": True, "whole_word": True}
+        self.assertEqual(
+            view.count_matches("the", Cat, ["bio"]),
+            {"rows": 3, "fields": [("bio", 3, None)]},
+        )
+
+    def test_count_overlapping_terms(self):
+        Cat.objects.create(name="Theo", bio="foo foo")
+        view = SearchAndReplaceView(models_and_fields=self.models_and_fields)
+        view.replace_options = {"ignore_case": True, "pairs": [("FO", "y")]}
+        self.assertEqual(
+            view.count_matches("foo", Cat, ["bio"]),
+            {"rows": 1, "fields": [("bio", 1, None)]},
+        )
+
+        view.replace_options = {"pairs": [("bar", "y")]}
+        self.assertEqual(
+            view.count_matches("foo", Cat, ["bio"]),
+            {"rows": 1, "fields": [("bio", 1, 2)]},
+        )
+        self.assertTrue(view.terms_overlap(["abc", "cde"]))
+        self.assertFalse(view.terms_overlap(["abc", "CAB"]))
+        self.assertTrue(view.terms_overlap(["abc", "CAB"], ignore_case=True))
+
+    def test_invalid_options(self):
+        form = SearchAndReplaceForm(
+            self.models_and_fields, data={"search": "(", "regex": "true"}
+        )
+        self.assertFalse(form.is_valid())
+        self.assertIn("search", form.errors)
+
+        form = SearchAndReplaceForm(
+            self.models_and_fields,
+            data={"search": "the", "replace": r"\1", "regex": "true"},
+        )
+        self.assertFalse(form.is_valid())
+        self.assertIn("replace", form.errors)
+
+        form = SearchAndReplaceForm(
+            self.models_and_fields, data={"search": "the", "pairs": "cat"}
+        )
+        self.assertFalse(form.is_valid())
+        self.assertIn("pairs", form.errors)
+
+        form = SearchAndReplaceForm(
+            self.models_and_fields,
+            data={"search": "the", "regex": "true", "pairs": "cat => dog"},
+        )
+        self.assertFalse(form.is_valid())
+
+
+class ReusePreviewMatchesTest(TestCase):
+    def setUp(self):
+        self.models_and_fields = [(Cat, ("name", "bio")), (Dog, ("name", "bark"))]
+        self.view = SearchAndReplaceView.as_view(
+            models_and_fields=self.models_and_fields, reuse_preview_matches=True
+        )
+        self.data = {
+            "search": "the",
+            "replace": "teh",
+            "search_and_replace_cat_bio": "true",
+            "search_and_replace_dog_bark": "true",
+        }
+
+        self.lucy = Cat.objects.create(name="Lucy", bio="Grew up in the deep south.")
+        self.peter = Cat.objects.create(name="Peter", bio="Child of the north.")
+        self.adam = Dog.objects.create(name="Adam", bark="Whef, the whef!")
+
+    def apply(self, data):
+        request = RequestFactory().post("/", data)
+        SessionMiddleware().process_request(request)
+        MessageMiddleware().process_request(request)
+        self.view(request)
+        return request
+
+    def test_apply_replaces_the_previewed_rows_by_primary_key(self):
+        response = self.view(RequestFactory().post("/", self.data))
+        preview_id = response.context_data["preview_id"]
+
+        momo = Cat.objects.create(name="Momo", bio="Not in the preview.")
+
+        with CaptureQueriesContext(connection) as queries:
+            self.apply(dict(self.data, apply="true", preview_id=preview_id))
+
+        selects = [q["sql"] for q in queries if q["sql"].startswith("SELECT")]
+        self.assertEqual(len(selects), 2)
+        self.assertTrue(all(" IN (" in select for select in selects))
+
+        self.lucy.refresh_from_db()
+        self.adam.refresh_from_db()
+        momo.refresh_from_db()
+        self.assertEqual(self.lucy.bio, "Grew up in teh deep south.")
+        self.assertEqual(self.adam.bark, "Whef, teh whef!")
+        self.assertEqual(momo.bio, "Not in the preview.")
+
+    def test_apply_skips_rows_changed_since_the_preview(self):
+        response = self.view(RequestFactory().post("/", self.data))
+        preview_id = response.context_data["preview_id"]
+
+        Cat.objects.filter(pk=self.peter.pk).update(bio="Child of the west.")
+
+        request = self.apply(dict(self.data, apply="true", preview_id=preview_id))
+
+        self.lucy.refresh_from_db()
+        self.peter.refresh_from_db()
+        self.assertEqual(self.lucy.bio, "Grew up in teh deep south.")
+        self.assertEqual(self.peter.bio, "Child of the west.")
+        self.assertIn(
+            "Skipped 1 instances that changed since the preview",
+            [str(message) for message in get_messages(request)],
+        )
+
+    def test_apply_searches_again_if_the_search_changed(self):
+        response = self.view(RequestFactory().post("/", self.data))
+        preview_id = response.context_data["preview_id"]
+
+        self.apply(dict(self.data, search="Child", apply="true", preview_id=preview_id))
+
+        self.peter.refresh_from_db()
+        self.assertEqual(self.peter.bio, "teh of the north.")
+
+
+class InstrumentationTest(TestCase):
+    def setUp(self):
+        self.models_and_fields = [(Cat, ("name", "bio")), (Dog, ("name", "bark"))]
+
+        Cat.objects.create(name="Lucy", bio="Grew up in the deep south.")
+        Cat.objects.create(name="Peter", bio="Child of the north.")
+        Cat.objects.create(name="Garfield", bio="Likes lasagna.")
+        Dog.objects.create(name="Adam", bark="Whef, the whef!")
+
+        self.stats = []
+
+        def receiver(sender, view, stats, **kwargs):
+            self.stats.append(stats)
+
+        model_processed.connect(receiver)
+        self.addCleanup(model_processed.disconnect, receiver)
+
+    def test_apply_sends_stats(self):
+        view = SearchAndReplaceView(models_and_fields=self.models_and_fields)
+        view.batch_size = 1
+
+        with self.assertLogs("search_and_replace", "INFO") as logs:
+            view.apply_search_and_replace(
+                "north", "south", Cat, ["name", "bio"], preview=False
+            )
+
+        (stats,) = self.stats
+        self.assertEqual(stats.model, Cat)
+        self.assertFalse(stats.preview)
+        self.assertEqual(stats.rows_scanned, 1)
+        self.assertEqual(stats.rows_changed, 1)
+        # two batch queries and one bulk update, every batch in its own savepoint
+        self.assertEqual(stats.queries, 7)
+        self.assertEqual(set(stats.timings), {"filter", "iterate", "replace", "save"})
+        self.assertEqual(logs.records[0].search_and_replace_stats["rows_changed"], 1)
+
+    def test_preview_renders_stats(self):
+        request = RequestFactory().post(
+            "/",
+            {
+                "search": "the",
+                "replace": "teh",
+                "search_and_replace_cat_bio": "true",
+                "search_and_replace_dog_bark": "true",
+            },
+        )
+        response = SearchAndReplaceView.as_view(
+            models_and_fields=self.models_and_fields, show_stats=True
+        )(request)
+
+        self.assertContains(response, 'class="stats"')
+        self.assertEqual(
+            [(stats.model, stats.rows_scanned) for stats in self.stats],
+            [(Cat, 2), (Dog, 1)],
+        )
+
+
+class FieldPathTest(TestCase):
+    def setUp(self):
+        self.north = Owner.objects.create(
+            name="Ned",
+            bio="Lord of the north.",
+            data={"title": "Warden of the north", "seats": [{"name": "the north"}]},
+        )
+        self.south = Owner.objects.create(name="Mace", bio="South.", data={})
+        self.horse = Horse.objects.create(name="Horse of the north", owner=self.north)
+        self.pony = Horse.objects.create(name="Pony", owner=self.north)
+        self.mule = Horse.objects.create(name="Mule", owner=self.south)
+        self.stray = Horse.objects.create(name="Stray")
+        self.fields = ["name", "owner__bio", "owner__data__title"]
+
+    def test_labels(self):
+        form = SearchAndReplaceForm([(Horse, self.fields)])
+        self.assertEqual(
+            form._get_field_label(Horse, "owner__data__title"), "owner / data / title"
+        )
+        self.assertEqual(
+            form._get_field_label(Horse, "owner__bio"), "owner / Biography"
+        )
+
+        with self.assertRaises(ImproperlyConfigured):
+            SearchAndReplaceForm([(Horse, ["owner__name__first"])])
+
+    def test_apply_replaces_in_related_fields_and_json_keys(self):
+        view = SearchAndReplaceView(models_and_fields=[(Horse, self.fields)])
+
+        with CaptureQueriesContext(connection) as queries:
+            count = view.apply_search_and_replace(
+                "north", "south", Horse, self.fields, preview=False
+            )
+
+        self.assertEqual(count, 2)
+        # the owners are loaded with the horses and written once
+        statements = [q["sql"].split()[0] for q in queries]
+        self.assertEqual(statements.count("SELECT"), 1)
+        self.assertEqual(statements.count("UPDATE"), 2)
+
+        self.horse.refresh_from_db()
+        self.north.refresh_from_db()
+        self.assertEqual(self.horse.name, "Horse of the south")
+        self.assertEqual(self.north.bio, "Lord of the south.")
+        self.assertEqual(
+            self.north.data,
+            {"title": "Warden of the south", "seats": [{"name": "the north"}]},
+        )
+
+    def test_filter_json_keys(self):
+        view = SearchAndReplaceView(
+            models_and_fields=[(Owner, ["data__seats__0__name"])]
+        )
+
+        self.assertEqual(
+            list(view.filter_qs("north", Owner, ["data__seats__0__name"])), [self.north]
+        )
+        self.assertEqual(
+            list(view.filter_qs("north", Owner, ["data__title"])), [self.north]
+        )
+        self.assertEqual(list(view.filter_qs("Warden", Owner, ["bio"])), [])
+
+
+@override_settings(
+    SEARCH_AND_REPLACE_INDEX={
+        "search_and_replace.Cat": ["name", "bio"],
+        "search_and_replace.Dog": ["name", "bark"],
+    }
+)
+class SearchIndexTest(TestCase):
+    def setUp(self):
+        self.models_and_fields = [(Cat, ("name", "bio")), (Dog, ("name", "bark"))]
+        self.lucy = Cat.objects.create(name="Lucy", bio="Grew up in the deep south.")
+        self.peter = Cat.objects.create(name="Peter", bio="Child of the north.")
+
+        patcher = mock.patch.object(SearchAndReplaceView, "search_index", True)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        self.view = SearchAndReplaceView(models_and_fields=self.models_and_fields)
+
+    def test_get_ngrams(self):
+        self.assertEqual(get_ngrams("North"), {"nor", "ort", "rth"})
+        self.assertEqual(get_ngrams("no"), set())
+
+    def test_build_and_update_the_index(self):
+        # searched without the index until it is built
+        self.assertIsNone(get_candidate_filter(Cat, ["bio"], ["north"]))
+        self.assertEqual(list(self.view.filter_qs("north", Cat, ["bio"])), [self.peter])
+
+        stdout = StringIO()
+        call_command("search_and_replace_index", stdout=stdout)
+        self.assertIn("search_and_replace.cat: indexed 2 instances", stdout.getvalue())
+
+        self.assertEqual(list(self.view.filter_qs("north", Cat, ["bio"])), [self.peter])
+        self.assertEqual(list(self.view.filter_qs("Peter", Cat, ["bio"])), [])
+        # too short for the index, searched without it
+        self.assertEqual(list(self.view.filter_qs("of", Cat, ["bio"])), [self.peter])
+
+        momo = Cat.objects.create(name="Momo", bio="Born in the north.")
+        self.assertEqual(
+            list(self.view.filter_qs("north", Cat, ["bio"])), [self.peter, momo]
+        )
+
+        # bulk updates of applied replacements are indexed as well
+        self.view.apply_search_and_replace("north", "west", Cat, ["bio"], preview=False)
+        self.assertEqual(list(self.view.filter_qs("north", Cat, ["bio"])), [])
+        self.assertEqual(
+            list(self.view.filter_qs("west", Cat, ["bio"])), [self.peter, momo]
+        )
+
+    def test_receivers_are_connected_per_model(self):
+        # connected from the setting, without instantiating a view
+        with self.settings(
+            SEARCH_AND_REPLACE_INDEX={"search_and_replace.Cat": ["bio"]}
+        ):
+            self.assertEqual(get_indexed_fields(), {Cat: {"bio"}})
+            SearchAndReplaceNgram.objects.all().delete()
+
+            Dog.objects.create(name="Adam", bark="Whef, north!")
+            Cat.objects.create(name="Momo", bio="Born in the north.")
+            self.assertEqual(
+                list(
+                    SearchAndReplaceNgram.objects.values_list(
+                        "model", "field"
+                    ).distinct()
+                ),
+                [("search_and_replace.cat", "bio")],
+            )
+            self.assertFalse(has_other_receivers(post_save, Cat))
+
+    def test_only_plain_text_fields_are_indexed(self):
+        with self.assertRaises(ImproperlyConfigured):
+            register_indexed_fields(Horse, ["owner__bio"])
+
+    def test_instances_saved_without_signals(self):
+        call_command("search_and_replace_index", stdout=StringIO())
+        # the candidates and the rows created since the build, not every row
+        self.assertEqual(
+            list(Cat.objects.filter(get_candidate_filter(Cat, ["bio"], ["north"]))),
+            [self.peter],
+        )
+        self.assertEqual(
+            SearchAndReplaceIndexedField.objects.get(
+                model="search_and_replace.cat", field="bio"
+            ).max_pk,
+            str(self.peter.pk),
+        )
+
+        Cat.objects.bulk_create([Cat(name="Momo", bio="Born in the north.")])
+        momo = Cat.objects.get(name="Momo")
+        self.assertEqual(
+            list(self.view.filter_qs("north", Cat, ["bio"])), [self.peter, momo]
+        )
+
+        # loaddata saves raw instances, which are indexed
+        Cat(pk=momo.pk, name="Momo", bio="Born in the west.").save_base(raw=True)
+        self.assertEqual(list(self.view.filter_qs("north", Cat, ["bio"])), [self.peter])
+        self.assertEqual(list(self.view.filter_qs("west", Cat, ["bio"])), [momo])
+
+
+@override_settings(
+    SEARCH_AND_REPLACE_VERSIONED_MODELS=[
+        "search_and_replace.Cat",
+        "search_and_replace.Dog",
+    ]
+)
+class PreviewCacheTest(TestCase):
+    def setUp(self):
+        self.models_and_fields = [(Cat, ("name", "bio")), (Dog, ("name", "bark"))]
+        self.lucy = Cat.objects.create(name="Lucy", bio="Grew up in the deep south.")
+
+        cache.clear()
+        self.addCleanup(cache.clear)
+        patcher = mock.patch.object(SearchAndReplaceView, "cache_previews", True)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def post(self, view_class=SearchAndReplaceView, **initkwargs):
+        request = RequestFactory().post(
+            "/",
+            {
+                "search": "south",
+                "replace": "north",
+                "search_and_replace_cat_bio": "true",
+            },
+        )
+        SessionMiddleware().process_request(request)
+        MessageMiddleware().process_request(request)
+        return view_class.as_view(
+            models_and_fields=self.models_and_fields, **initkwargs
+        )(request)
+
+    def test_data_version_changes_with_the_data(self):
+        self.assertEqual(get_versioned_models(), {Cat, Dog})
+        version = get_data_version(Cat)
+        self.assertEqual(get_data_version(Cat), version)
+
+        self.lucy.save()
+        self.assertNotEqual(get_data_version(Cat), version)
+
+        version = get_data_version(Cat)
+        Cat.objects.create(name="Peter", bio="Child of the north.").delete()
+        self.assertNotEqual(get_data_version(Cat), version)
+
+    def test_receivers_are_connected_from_the_setting(self):
+        # without a view or the url configuration, e.g. in a worker
+        with self.settings(
+            SEARCH_AND_REPLACE_VERSIONED_MODELS=["search_and_replace.Cat"],
+            ROOT_URLCONF="does.not.exist",
+        ):
+            self.assertEqual(get_versioned_models(), {Cat})
+            version = get_data_version(Cat)
+            self.lucy.save()
+            self.assertNotEqual(get_data_version(Cat), version)
+
+            # loaddata
+            version = get_data_version(Cat)
+            self.lucy.save_base(raw=True)
+            self.assertNotEqual(get_data_version(Cat), version)
+            self.assertFalse(has_other_receivers(post_save, Cat))
+            self.assertFalse(post_save.has_listeners(Dog))
+
+    def test_models_without_data_versions_are_not_cached(self):
+        with self.settings(SEARCH_AND_REPLACE_VERSIONED_MODELS=[]):
+            self.post()
+            Cat.objects.update(bio="Grew up in the far south.")
+            self.assertContains(self.post(), "Grew up in the far north.")
+
+    def test_preview_is_cached_until_the_data_changes(self):
+        self.assertContains(self.post(), "Grew up in the deep north.")
+
+        # update() sends no signal, so the cached preview is still shown
+        Cat.objects.update(bio="Grew up in the far south.")
+        with self.assertNumQueries(1):  # only the maximum primary key of Cat
+            self.assertContains(self.post(), "Grew up in the deep north.")
+
+        Cat.objects.get().save()
+        self.assertContains(self.post(), "Grew up in the far north.")
+
+    def test_cached_rows_keep_only_the_primary_key_and_label(self):
+        self.post()
+        ((model, page),) = self.post().context_data["results"]
+        ((instance, diffs),) = page
+        self.assertIsInstance(instance, PreviewInstance)
+        self.assertEqual((instance.pk, str(instance)), (self.lucy.pk, str(self.lucy)))
+
+    def test_views_do_not_share_previews(self):
+        class HiddenCatsView(SearchAndReplaceView):
+            def get_query_set(self, model):
+                return model._default_manager.none()
+
+        self.assertContains(self.post(), "Grew up in the deep north.")
+        self.assertNotContains(self.post(HiddenCatsView), "Grew up in the deep north.")
+
+    def test_preview_cache_key_parts(self):
+        class TenantView(SearchAndReplaceView):
+            tenant = "a"
+
+            def get_preview_cache_key_parts(self, model, fields):
+                return [self.tenant]
+
+        self.post(TenantView)
+        Cat.objects.update(bio="Grew up in the far south.")
+        self.assertContains(self.post(TenantView), "Grew up in the deep north.")
+        self.assertContains(
+            self.post(TenantView, tenant="b"), "Grew up in the far north."
+        )
+
+    def test_large_pages_are_not_cached(self):
+        self.post(preview_cache_max_size=10)
+        Cat.objects.update(bio="Grew up in the far south.")
+        self.assertContains(
+            self.post(preview_cache_max_size=10), "Grew up in the far north."
+        )
+
+
+class DatabasesTest(TransactionTestCase):
+    # the databases are searched and replaced in worker threads
+    databases = {"default", "other"}
+
+    def setUp(self):
+        self.models_and_fields = [(Cat, ("name", "bio")), (Dog, ("name", "bark"))]
+        Cat.objects.create(name="Lucy", bio="Grew up in the deep south.")
+        Cat.objects.using("other").create(name="Peter", bio="Child of the south.")
+        Cat.objects.using("other").create(name="Momo", bio="Born in the south.")
+
+    def post(self, data, **initkwargs):
+        request = RequestFactory().post(
+            "/", dict(data, search="south", search_and_replace_cat_bio="true")
+        )
+        SessionMiddleware().process_request(request)
+        MessageMiddleware().process_request(request)
+        return SearchAndReplaceView.as_view(
+            models_and_fields=self.models_and_fields,
+            databases=["default", "other"],
+            **initkwargs
+        )(request)
+
+    def test_preview_every_database(self):
+        response = self.post({"replace": "north"}, preview_page_size=1)
+        self.assertContains(response, "Lucy")
+        self.assertContains(response, "Peter")
+        self.assertNotContains(response, "Momo")
+        self.assertContains(response, 'name="page_search_and_replace_cat_other"')
+        self.assertContains(response, "Showing 3 results")
+
+        response = self.post({"statistics": "true"})
+        self.assertEqual(
+            response.context_data["statistics"],
+            [(Cat, {"rows": 3, "fields": [("bio", 3, 3)]})],
+        )
+
+    def test_apply_and_revert_every_database(self):
+        self.post(
+            {"replace": "north", "apply": "true", "preview_id": "an-id-for-databases"},
+            undo_log=True,
+        )
+
+        self.assertEqual(
+            list(Cat.objects.values_list("bio", flat=True)),
+            ["Grew up in the deep north."],
+        )
+        self.assertEqual(
+            list(
+                Cat.objects.using("other").order_by("pk").values_list("bio", flat=True)
+            ),
+            ["Child of the north.", "Born in the north."],
+        )
+
+        job = SearchAndReplaceJob.objects.get()
+        self.assertEqual(
+            [
+                (progress.database, progress.rows_changed)
+                for progress in job.progress.all()
+            ],
+            [("default", 1), ("other", 2)],
+        )
+        view = SearchAndReplaceView(databases=["default", "other"])
+        self.assertEqual(view.get_max_workers(), 2)
+        view.revert_job(job)
+        self.assertEqual(
+            list(
+                Cat.objects.using("other").order_by("pk").values_list("bio", flat=True)
+            ),
+            ["Child of the south.", "Born in the south."],
+        )
+
+
+class SearchAndReplaceCommandTest(TestCase):
+    def setUp(self):
+        self.lucy = Cat.objects.create(name="Lucy", bio="Grew up in the deep south.")
+        self.peter = Cat.objects.create(name="Peter", bio="Child of the north.")
+        self.adam = Dog.objects.create(name="Adam", bark="Whef, the whef!")
+
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        self.checkpoint = os.path.join(directory, "checkpoint.json")
+
+    def test_replace(self):
+        out = StringIO()
+        call_command(
+            "search_and_replace",
+            "the",
+            "teh",
+            "--model",
+            "search_and_replace.cat",
+            "--field",
+            "bio",
+            stdout=out,
+        )
+
+        self.lucy.refresh_from_db()
+        self.adam.refresh_from_db()
+        self.assertEqual(self.lucy.bio, "Grew up in teh deep south.")
+        self.assertEqual(self.adam.bark, "Whef, the whef!")
+        self.assertEqual(
+            out.getvalue(), "search_and_replace.cat: scanned 2, changed 2\n"
+        )
+
+    def test_resume_from_checkpoint(self):
+        call_command(
+            "search_and_replace",
+            "the",
+            "teh",
+            "--batch-size",
+            "1",
+            "--checkpoint",
+            self.checkpoint,
+            stdout=StringIO(),
+        )
+        with open(self.checkpoint) as f:
+            checkpoint = json.load(f)
+        self.assertEqual(
+            checkpoint["models"]["search_and_replace.cat"],
+            {"last_pk": self.peter.pk, "scanned": 2, "changed": 2, "done": True},
+        )
+
+        # pretend the first run stopped after lucy
+        checkpoint["models"] = {
+            "search_and_replace.cat": {
+                "last_pk": self.lucy.pk,
+                "scanned": 1,
+                "changed": 1,
+                "done": False,
+            }
+        }
+        with open(self.checkpoint, "w") as f:
+            json.dump(checkpoint, f)
+        Cat.objects.update(bio="the")
+        Dog.objects.update(bark="the")
+
+        out = StringIO()
+        call_command(
+            "search_and_replace",
+            "the",
+            "teh",
+            "--checkpoint",
+            self.checkpoint,
+            stdout=out,
+        )
+
+        self.lucy.refresh_from_db()
+        self.peter.refresh_from_db()
+        self.adam.refresh_from_db()
+        self.assertEqual(self.lucy.bio, "the")
+        self.assertEqual(self.peter.bio, "teh")
+        self.assertEqual(self.adam.bark, "teh")
+
+    def test_undo_log_job_with_stats(self):
+        with mock.patch.multiple(SearchAndReplaceView, undo_log=True, show_stats=True):
+            call_command("search_and_replace", "the", "teh", stdout=StringIO())
+
+        job = SearchAndReplaceJob.objects.get()
+        self.assertEqual(job.status, job.DONE)
+        self.assertIsNotNone(job.started)
+        self.assertIsNotNone(job.finished)
+
+    def test_failed_undo_log_job(self):
+        with mock.patch.object(SearchAndReplaceView, "undo_log", True):
+            with mock.patch.object(
+                SearchAndReplaceView,
+                "apply_search_and_replace",
+                side_effect=ValueError("broken"),
+            ):
+                with self.assertRaises(ValueError):
+                    call_command("search_and_replace", "the", "teh", stdout=StringIO())
+
+        job = SearchAndReplaceJob.objects.get()
+        self.assertEqual(job.status, job.FAILED)
+        self.assertIn("broken", job.error)
+        self.assertIsNotNone(job.finished)
+
+    def test_checkpoint_of_another_search_is_rejected(self):
+        call_command(
+            "search_and_replace",
+            "the",
+            "teh",
+            "--checkpoint",
+            self.checkpoint,
+            stdout=StringIO(),
+        )
+        with self.assertRaises(CommandError):
+            call_command(
+                "search_and_replace",
+                "the",
+                "thy",
+                "--checkpoint",
+                self.checkpoint,
+                stdout=StringIO(),
+            )
@@ -1,24 +1,163 @@
+import asyncio
+import copy
+import hashlib
+import inspect
+import logging
+import pickle
+import re
+import time
+import traceback
 import uuid
+from functools import update_wrapper
 
+from asgiref.sync import async_to_sync, sync_to_async
+from django.apps import apps
 from django.contrib import messages
 from django.core.cache import cache
-from django.db.models import Q
-from django.http import HttpResponseRedirect
-from django.utils.translation import ugettext_lazy as _
+from django.core.exceptions import ImproperlyConfigured
+from django.core.paginator import Paginator
+from django.db import connections, models, router, transaction
+from django.db.models import Count, F, Q, Sum, Value
+from django.db.models.constants import LOOKUP_SEP
+from django.db.models.functions import Length, Lower, Replace
+from django.db.models.signals import post_save, pre_save
+from django.http import (
+    Http404,
+    HttpResponseRedirect,
+    JsonResponse,
+    StreamingHttpResponse,
+)
+from django.template.context import make_context
+from django.template.loader import select_template
+from django.template.loader_tags import (
+    BLOCK_CONTEXT_KEY,
+    BlockContext,
+    BlockNode,
+    ExtendsNode,
+)
+from django.utils import timezone
+from django.utils.safestring import mark_safe
+from django.utils.translation import gettext_lazy as _
 from django.views.generic import TemplateView
 
+from .diffs import FieldDiff, PreviewInstance, get_snippets
+from .executors import ThreadExecutor, get_default_executor
 from .forms import SearchAndReplaceForm
+from .models import (
+    SearchAndReplaceChange,
+    SearchAndReplaceJob,
+    SearchAndReplaceJobProgress,
+)
+from .paths import get_field_path, is_json_field, is_plain_text_field
+from .preview_cache import (
+    bump_data_version,
+    get_data_version,
+    get_versioned_models,
+)
+from .replacers import get_replacer
+from .search_backends import get_search_backend_class
+from .search_index import (
+    get_candidate_filter,
+    get_indexed_fields,
+    has_other_receivers,
+    index_instances,
+)
+from .signals import model_processed
+from .stats import ModelStats
+
+logger = logging.getLogger(__name__)
+
+
+def render_block(template, name, context, request=None):
+    """
+    Renders only the block name of a Django template, including the overrides of the
+    templates extending it, without rendering the rest of the page.
+    """
+    context = make_context(
+        context, request, autoescape=template.backend.engine.autoescape
+    )
+    template = template.template
+    with context.render_context.push_state(template), context.bind_template(template):
+        block_context = BlockContext()
+        while True:
+            first = template.nodelist[0] if template.nodelist else None
+            extends = first if isinstance(first, ExtendsNode) else None
+            if extends is None:
+                # the blocks of the template at the root of the inheritance chain
+                blocks = template.nodelist.get_nodes_by_type(BlockNode)
+                block_context.add_blocks({block.name: block for block in blocks})
+                break
+            block_context.add_blocks(extends.blocks)
+            template = extends.get_parent(context)
+        context.render_context[BLOCK_CONTEXT_KEY] = block_context
+        block = block_context.get_block(name)
+        if block is None:
+            raise ImproperlyConfigured(
+                "{} has no block {}.".format(context.template_name, name)
+            )
+        return block.render(context)
 
 
 class SearchAndReplaceView(TemplateView):
     template_name = "search_and_replace/search_and_replace.html"
     form_class = SearchAndReplaceForm
     models_and_fields = None
+    # a search_and_replace.search_backends.SearchBackend subclass, None to choose by vendor
+    search_backend = None
+    # replace with a single UPDATE ... SET field = REPLACE(field, ...) per model where possible
+    database_replace = False
+    # number of instances loaded per query and written per transaction
+    batch_size = 500
+    # lock the rows of every batch with SELECT ... FOR UPDATE while replacing them
+    select_for_update = False
+    # skip rows locked by other transactions instead of waiting, requires select_for_update
+    skip_locked = False
+    # seconds to sleep between two batches when applying replacements
+    throttle = 0
+    # number of instances shown per model and preview page
+    preview_page_size = 100
+    # number of characters shown before and after every occurrence in the preview
+    context_size = 40
+    # number of models searched and replaced concurrently
+    max_workers = 1
+    # render the timings and query counts of every model below the preview
+    show_stats = False
+    # store the matches of the preview and apply the replacements to exactly these rows
+    reuse_preview_matches = False
+    # maximum number of matches per model stored for reuse_preview_matches
+    preview_match_limit = 10000
+    # apply replacements in a background job, see get_executor
+    background = False
+    # an object with a concurrent.futures.Executor compatible submit method
+    executor = None
+    # store the old value of every replaced field so the job can be reverted
+    undo_log = False
+    # look up candidates of the fields in the SEARCH_AND_REPLACE_INDEX setting in the
+    # n-gram index, see search_and_replace.search_index
+    search_index = False
+    # cache preview pages of the models in the SEARCH_AND_REPLACE_VERSIONED_MODELS
+    # setting until their data changes, see get_data_version
+    cache_previews = False
+    # seconds a cached preview page is kept
+    preview_cache_timeout = 300
+    # preview pages larger than this many bytes are not cached
+    preview_cache_max_size = 1024 * 1024
+    # send the preview with a StreamingHttpResponse, the results as every model is searched
+    stream_preview = False
+    # database aliases every model is searched and replaced in, None for the router's choice
+    databases = None
+
+    def __init__(self, **kwargs):
+        # reset by form_valid, the management command uses the view without it
+        self.skipped_instances = 0
+        self.stats = []
+        super().__init__(**kwargs)
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         context["title"] = _("Search and replace")
         context["form"] = self.form
+        context["job"] = getattr(self, "job", None)
         return context
 
     def get_form(self, request):
@@ -26,8 +165,22 @@ class SearchAndReplaceView(TemplateView):
             self.models_and_fields, data=request.POST if request.POST else None
         )
 
+    def get_job(self, request):
+        job_id = request.GET.get("job")
+        if job_id is None:
+            return None
+        if not job_id.isdigit():
+            raise Http404
+        try:
+            return SearchAndReplaceJob.objects.get(pk=job_id)
+        except SearchAndReplaceJob.DoesNotExist:
+            raise Http404
+
     def get(self, request, *args, **kwargs):
         self.form = self.get_form(request)
+        self.job = self.get_job(request)
+        if self.job is not None and request.GET.get("format") == "json":
+            return JsonResponse(self.job.get_progress_data())
         return super().get(request, *args, **kwargs)
 
     def is_double_submit(self):
@@ -42,10 +195,110 @@ class SearchAndReplaceView(TemplateView):
             cache.set(cache_key, "done")
             return False
 
+    def get_preview_signature(self, search, replace):
+        """
+        Identifies a search, matches of a preview are only reused for the same signature.
+        """
+        return (
+            search,
+            replace,
+            sorted(self.get_replace_options().items()),
+            [
+                (model._meta.label_lower, list(fields))
+                for model, fields in self.form.get_selected_fields()
+            ],
+        )
+
+    def get_checksum(self, values):
+        return hashlib.sha1(repr(tuple(values)).encode()).hexdigest()[:16]
+
+    def find_matches(self, search, model, fields, using=None):
+        """
+        Returns a {pk: checksum of the field values} dict for all matching rows,
+        None if there are more than preview_match_limit matches.
+        """
+        rows = (
+            self.filter_qs(search, model, fields, using)
+            .order_by("pk")
+            .values_list("pk", *fields)[: self.preview_match_limit + 1]
+        )
+        matches = {pk: self.get_checksum(values) for pk, *values in rows}
+        if len(matches) > self.preview_match_limit:
+            return None
+        return matches
+
+    def store_preview_matches(self, search, replace):
+        targets = self.get_targets()
+        matches = self.map_models(
+            lambda target: self.find_matches(search, *target), targets
+        )
+        cache.set(
+            "search-replace-preview-{}".format(self.preview_id),
+            {
+                "signature": self.get_preview_signature(search, replace),
+                "matches": {
+                    self.get_model_key(model, using): model_matches
+                    for (model, _, using), model_matches in zip(targets, matches)
+                },
+            },
+        )
+
+    def load_preview_matches(self, search, replace):
+        """
+        Returns the matches stored by the preview if it used the same search.
+        """
+        preview_id = self.request.POST.get("preview_id")
+        preview = cache.get("search-replace-preview-{}".format(preview_id))
+        if preview and preview["signature"] == self.get_preview_signature(
+            search, replace
+        ):
+            return preview["matches"]
+        return {}
+
+    def get_databases(self, model):
+        """
+        Returns the database aliases model is searched and replaced in,
+        [None] to use the alias chosen by the router.
+        """
+        return list(self.databases) if self.databases else [None]
+
+    def get_targets(self):
+        """
+        Returns a list of (model, selected fields, database alias) tuples,
+        one per selected model and database.
+        """
+        return [
+            (model, fields, using)
+            for model, fields in self.form.get_selected_fields()
+            for using in self.get_databases(model)
+        ]
+
+    def get_model_key(self, model, using=None):
+        """
+        Identifies model in a database, e.g. for the matches stored by the preview.
+        """
+        if using is None:
+            return model._meta.label_lower
+        return "{}@{}".format(model._meta.label_lower, using)
+
+    def get_resume_pk(self, model, using=None):
+        """
+        Returns the primary key after which replacing model continues, e.g. the last
+        primary key processed by an interrupted search_and_replace command.
+        """
+        return getattr(self, "resume_pks", {}).get(self.get_model_key(model, using))
+
+    def get_preview_matches(self, model, using=None):
+        return getattr(self, "preview_matches", {}).get(
+            self.get_model_key(model, using)
+        )
+
     def post(self, request, *args, **kwargs):
         self.form = self.get_form(request)
         if self.form.is_valid():
-            if "apply" in request.POST and not self.is_double_submit():
+            if "statistics" in request.POST:
+                return self.form_statistics()
+            elif "apply" in request.POST and not self.is_double_submit():
                 return self.form_valid(preview=False)
             else:
                 return self.form_valid(preview=True)
@@ -54,57 +307,969 @@ class SearchAndReplaceView(TemplateView):
     def get_query_set(self, model):
         return model._default_manager.all()
 
-    def filter_qs(self, search, model, fields):
-        assert fields
+    def get_database_query_set(self, model, using=None):
+        """
+        Returns get_query_set(model) reading from the database alias using if given.
+        """
         qs = self.get_query_set(model)
+        if using is not None:
+            qs = qs.using(using)
+        return qs
+
+    def get_search_backend(self, model, using=None):
+        """
+        Returns the search backend building the filters for model,
+        by default the one for the vendor of the database model is read from.
+        """
+        connection = connections[using or router.db_for_read(model)]
+        backend_class = self.search_backend or get_search_backend_class(connection)
+        return backend_class(connection)
+
+    def get_replace_options(self):
+        """
+        Returns the options of the current search and replace, see
+        SearchAndReplaceForm.get_replace_options.
+        """
+        return getattr(self, "replace_options", {})
+
+    def get_replacer(self, search, replace):
+        options = self.get_replace_options()
+        return get_replacer(
+            ((search, replace), *options.get("pairs", ())),
+            regex=options.get("regex", False),
+            ignore_case=options.get("ignore_case", False),
+            whole_word=options.get("whole_word", False),
+        )
+
+    def annotate_lookups(self, qs, model, fields):
+        """
+        Returns the queryset and a list with the lookup to filter every field by.
+        """
+        lookups = []
+        for field in fields:
+            path = get_field_path(model, field)
+            if path.keys:
+                # JSON keys are filtered as text, which needs an annotation
+                lookup = "search_and_replace_{}".format(len(lookups))
+                qs = qs.annotate(**{lookup: path.get_text_expression()})
+                lookups.append(lookup)
+            else:
+                lookups.append(field)
+        return qs, lookups
+
+    def get_search_terms(self, search):
+        return [
+            search,
+            *(term for term, _ in self.get_replace_options().get("pairs", ())),
+        ]
+
+    def get_search_filter(self, search, model, lookups, using=None):
+        """
+        Returns a Q object matching the rows containing search in any of lookups.
+        """
+        backend = self.get_search_backend(model, using)
+        options = self.get_replace_options()
+        ignore_case = options.get("ignore_case", False)
+        if options.get("regex") or options.get("whole_word"):
+            if options.get("regex"):
+                pattern = search
+            else:
+                pattern = "|".join(
+                    re.escape(term) for term in self.get_search_terms(search)
+                )
+            if options.get("whole_word"):
+                pattern = backend.get_whole_word_pattern(pattern)
+            return backend.get_regex_filter(pattern, lookups, ignore_case=ignore_case)
         filter = Q()
+        for term in self.get_search_terms(search):
+            if ignore_case:
+                filter |= backend.get_ignore_case_filter(term, lookups)
+            else:
+                filter |= backend.get_filter(term, lookups)
+        return filter
+
+    def filter_qs(self, search, model, fields, using=None):
+        assert fields
+        qs, lookups = self.annotate_lookups(
+            self.get_database_query_set(model, using), model, fields
+        )
+        # the n-gram index only covers the database chosen by the router
+        if (
+            self.search_index
+            and using is None
+            and not self.get_replace_options().get("regex")
+        ):
+            candidates = get_candidate_filter(
+                model, fields, self.get_search_terms(search)
+            )
+            if candidates is not None:
+                qs = qs.filter(candidates)
+        return qs.filter(self.get_search_filter(search, model, lookups, using))
+
+    def count_matches(self, search, model, fields, using=None):
+        """
+        Returns {"rows": matching rows, "fields": [(field, rows, occurrences), ...]},
+        counted by the database without loading any instance.
+        Occurrences are None for regular expressions, whole words and terms that overlap.
+        """
+        qs, lookups = self.annotate_lookups(
+            self.get_database_query_set(model, using), model, fields
+        )
+        terms = self.get_search_terms(search)
+        options = self.get_replace_options()
+        ignore_case = options.get("ignore_case")
+        regex = (
+            options.get("regex")
+            or options.get("whole_word")
+            or self.terms_overlap(terms, ignore_case)
+        )
+        aggregates = {"rows": Count("pk")}
+        for index, lookup in enumerate(lookups):
+            aggregates["rows_{}".format(index)] = Count(
+                "pk", filter=self.get_search_filter(search, model, [lookup], using)
+            )
+            if not regex:
+                # every occurrence of a term shortens the value by the length of the term
+                value = Lower(F(lookup)) if ignore_case else F(lookup)
+                occurrences = [
+                    (
+                        Length(value)
+                        - Length(
+                            Replace(value, Value(term.lower() if ignore_case else term))
+                        )
+                    )
+                    / Value(len(term))
+                    for term in terms
+                ]
+                aggregates["occurrences_{}".format(index)] = Sum(
+                    sum(occurrences[1:], occurrences[0])
+                )
+        counts = qs.filter(
+            self.get_search_filter(search, model, lookups, using)
+        ).aggregate(**aggregates)
+        return {
+            "rows": counts["rows"],
+            "fields": [
+                (
+                    field,
+                    counts["rows_{}".format(index)],
+                    None if regex else counts["occurrences_{}".format(index)] or 0,
+                )
+                for index, field in enumerate(fields)
+            ],
+        }
+
+    def terms_overlap(self, terms, ignore_case=False):
+        """
+        Returns True if an occurrence of one of terms may overlap one of another term,
+        e.g. foo and fo. The replacer only replaces one of them, counting each term with
+        REPLACE would count both.
+        """
+        if ignore_case:
+            terms = [term.lower() for term in terms]
+        for index, term in enumerate(terms):
+            for other in terms[index + 1 :]:
+                if term in other or other in term:
+                    return True
+                if any(
+                    term.endswith(other[:length]) or other.endswith(term[:length])
+                    for length in range(1, min(len(term), len(other)))
+                ):
+                    return True
+        return False
+
+    def get_select_related(self, model):
+        """
+        Returns the relations to load using select_related, e.g. the ones used by __str__.
+        """
+        return ()
+
+    def get_preview_fields(self, model):
+        """
+        Returns the names of the additional fields needed to display instances in the preview,
+        e.g. the ones used by __str__. Returning None loads all fields.
+        """
+        return None
+
+    def get_only_fields(self, model, fields, preview):
+        """
+        Returns the field names to load with only(), None to load all fields.
+        """
+        paths = [get_field_path(model, field) for field in fields]
+        if not all(
+            path.keys or is_plain_text_field(path.field.model, path.field.name)
+            for path in paths
+        ):
+            return None
+        extra_fields = ()
+        if preview:
+            extra_fields = self.get_preview_fields(model)
+            if extra_fields is None:
+                return None
+        related = [path.split(LOOKUP_SEP)[0] for path in self.get_select_related(model)]
+        # every relation followed to a field has to be loaded as well
+        relations = [
+            LOOKUP_SEP.join(path.relations[:length])
+            for path in paths
+            for length in range(1, len(path.relations) + 1)
+        ]
+        return list(
+            dict.fromkeys(
+                [
+                    model._meta.pk.name,
+                    *relations,
+                    *(path.field_path for path in paths),
+                    *extra_fields,
+                    *related,
+                ]
+            )
+        )
+
+    def get_instances(self, search, model, fields, preview, using=None):
+        """
+        Returns the matching instances with only the columns needed to replace (and display) them.
+        """
+        qs = self.filter_qs(search, model, fields, using)
+        select_related = list(self.get_select_related(model))
         for field in fields:
-            filter |= Q(**{"{}__contains".format(field): search})
-        return qs.filter(filter)
-
-    def apply_search_and_replace(self, search, replace, model, fields, preview):
-        qs = self.filter_qs(search, model, fields)
-        results = []
-        for instance in qs:
-            changed_fields = []
-            for field in fields:
-                value = getattr(instance, field)
-
-                # support for markup fields
-                if hasattr(value, "raw"):
-                    value = value.raw
-
-                if search in value:
-                    new_value = value.replace(search, replace)
-                    setattr(instance, field, new_value)
-                    changed_fields.append((field, value, new_value))
-            results.append((instance, changed_fields))
-            if not preview:
-                instance.save()
-        return results
-
-    def get_results(self, search, replace, preview=True):
-        results = []
-        for model, selected_fields in self.form.get_selected_fields():
-            result = self.apply_search_and_replace(
-                search, replace, model, selected_fields, preview=preview
+            relation = get_field_path(model, field).relation
+            if relation is not None and relation not in select_related:
+                select_related.append(relation)
+        if select_related:
+            qs = qs.select_related(*select_related)
+        only_fields = self.get_only_fields(model, fields, preview)
+        if only_fields is not None:
+            qs = qs.only(*only_fields)
+        if not preview and self.select_for_update:
+            qs = self.lock_qs(qs, model, select_related, using)
+        return qs
+
+    def lock_qs(self, qs, model, select_related=None, using=None):
+        """
+        Adds SELECT ... FOR UPDATE to the queryset, locking only the rows of model
+        where the database supports it. Rows are locked on the database written to.
+        """
+        using = using or router.db_for_write(model)
+        kwargs = {"skip_locked": self.skip_locked}
+        if select_related and connections[using].features.has_select_for_update_of:
+            kwargs["of"] = ("self",)
+        return qs.using(using).select_for_update(**kwargs)
+
+    def requires_instance_save(self, model):
+        """
+        Returns True if instances of model have to be saved one by one,
+        i.e. if the model overrides save() or has pre_save / post_save receivers.
+        """
+        return (
+            model.save is not models.Model.save
+            or pre_save.has_listeners(model)
+            or has_other_receivers(post_save, model)
+        )
+
+    def can_replace_in_database(self, model, fields):
+        # the n-gram index is only updated for saved instances
+        if model in get_indexed_fields():
+            return False
+        return not self.requires_instance_save(model) and all(
+            is_plain_text_field(model, field) for field in fields
+        )
+
+    def replace_in_database(self, search, replace, model, fields, using=None):
+        """
+        Replaces search with replace in all matching rows using a single UPDATE.
+        Returns the number of affected rows.
+        """
+        qs = self.filter_qs(search, model, fields, using)
+        count = qs.update(
+            **{
+                field: Replace(F(field), Value(search), Value(replace))
+                for field in fields
+            }
+        )
+        # like bulk_update, UPDATE doesn't send post_save
+        if model in get_versioned_models():
+            bump_data_version(model)
+        return count
+
+    def get_update_fields(self, model, fields):
+        """
+        Returns the field names to pass as update_fields, None if all fields have to be saved.
+        Non plain fields (e.g. markup fields) may depend on other columns, so these
+        instances are saved completely.
+        """
+        if all(
+            is_plain_text_field(model, field)
+            or is_json_field(model._meta.get_field(field))
+            for field in fields
+        ):
+            return list(fields)
+        return None
+
+    def get_changed_owners(self, model, changed):
+        """
+        Returns a list of (model, [(instance, [changed field name, ...]), ...]) tuples
+        for the instances of model and the related instances holding the changed fields.
+        Field paths are resolved to the name of the model field holding the value.
+        """
+        owners = {}
+        for instance, names in changed:
+            for name in names:
+                path = get_field_path(model, name)
+                owner = path.get_owner(instance)
+                # related instances loaded by several rows are written once
+                _, owner_fields = owners.setdefault(owner.__class__, {}).setdefault(
+                    owner.pk, (owner, [])
+                )
+                if path.field.name not in owner_fields:
+                    owner_fields.append(path.field.name)
+        return [
+            (owner_model, list(owner_changed.values()))
+            for owner_model, owner_changed in owners.items()
+        ]
+
+    def save_instances(self, model, changed, using=None):
+        """
+        Writes a batch of (instance, [changed field name, ...]) tuples in a single transaction.
+        Uses bulk_update unless the model requires calling save() on every instance.
+        """
+        # no savepoint when called from the transaction of replace_matches
+        with transaction.atomic(
+            using=using or router.db_for_write(model), savepoint=False
+        ):
+            for owner_model, owner_changed in self.get_changed_owners(model, changed):
+                self.save_model_instances(owner_model, owner_changed, using)
+
+    def save_model_instances(self, model, changed, using=None):
+        fields = sorted({name for _, names in changed for name in names})
+        update_fields = self.get_update_fields(model, fields)
+        if update_fields is not None and not self.requires_instance_save(model):
+            instances = [instance for instance, _ in changed]
+            model._base_manager.db_manager(using).bulk_update(instances, update_fields)
+            # bulk_update doesn't send post_save, which keeps the index up to date
+            indexed_fields = (
+                get_indexed_fields().get(model, set()).intersection(update_fields)
             )
-            if result:
-                results.append((model, result))
-        return results
+            if indexed_fields and using is None:
+                index_instances(model, instances, indexed_fields)
+            if model in get_versioned_models():
+                bump_data_version(model)
+        else:
+            for instance, names in changed:
+                instance.save(
+                    using=using, update_fields=None if update_fields is None else names
+                )
+
+    def iter_batches(self, qs, start_after=None):
+        """
+        Yields lists of at most batch_size instances ordered by primary key,
+        starting after the primary key start_after if given.
+        Uses keyset pagination so neither the queryset nor the database cursor has
+        to hold all matches and rows written in between are never returned twice.
+        """
+        qs = qs.order_by("pk")
+        last_pk = start_after
+        while True:
+            page = qs if last_pk is None else qs.filter(pk__gt=last_pk)
+            batch = list(page[: self.batch_size])
+            if batch:
+                yield batch
+            if len(batch) < self.batch_size:
+                return
+            last_pk = batch[-1].pk
+
+    def iter_pk_batches(self, qs, pks):
+        """
+        Yields lists of the instances of qs with the given primary keys,
+        loading at most batch_size instances per query.
+        """
+        qs = qs.order_by("pk")
+        for start in range(0, len(pks), self.batch_size):
+            batch = list(qs.filter(pk__in=pks[start : start + self.batch_size]))
+            if batch:
+                yield batch
+
+    def get_value(self, instance, field):
+        value = get_field_path(instance.__class__, field).get_value(instance)
+
+        # support for markup fields
+        if hasattr(value, "raw"):
+            value = value.raw
+
+        return value
+
+    def get_instance_checksum(self, instance, fields):
+        return self.get_checksum(self.get_value(instance, field) for field in fields)
+
+    def replace_instance(self, search, replace, instance, fields):
+        """
+        Replaces search in the given fields of instance.
+        Returns a list of (field name, old value, new value) tuples for the changed fields.
+        """
+        replacer = self.get_replacer(search, replace)
+        changed_fields = []
+        for field in fields:
+            value = self.get_value(instance, field)
+            if isinstance(value, str) and replacer.search(value):
+                new_value = replacer.replace(value)
+                get_field_path(instance.__class__, field).set_value(instance, new_value)
+                changed_fields.append((field, value, new_value))
+        return changed_fields
+
+    def iter_changed_batches(self, search, replace, model, fields, stats, using=None):
+        """
+        Yields (batch, [(instance, changed fields), ...]) tuples, one per batch of
+        matching instances.
+        """
+        with stats.timer("filter"):
+            qs = self.get_instances(search, model, fields, preview=False, using=using)
+            matches = self.get_preview_matches(model, using)
+            if matches is None:
+                batches = self.iter_batches(qs, self.get_resume_pk(model, using))
+            else:
+                batches = self.iter_pk_batches(qs, sorted(matches))
+        while True:
+            with stats.timer("iterate"):
+                batch = next(batches, None)
+            if batch is None:
+                return
+            stats.rows_scanned += len(batch)
+            changes = []
+            with stats.timer("replace"):
+                for instance in batch:
+                    if matches is not None:
+                        checksum = self.get_instance_checksum(instance, fields)
+                        if checksum != matches[instance.pk]:
+                            # changed since the preview
+                            self.skipped_instances += 1
+                            continue
+                    changed_fields = self.replace_instance(
+                        search, replace, instance, fields
+                    )
+                    if changed_fields:
+                        changes.append((instance, changed_fields))
+            yield batch, changes
+
+    def get_page_parameter(self, model, using=None):
+        opts = model._meta
+        if using is not None:
+            return "page_{}_{}_{}".format(opts.app_label, opts.model_name, using)
+        return "page_{}_{}".format(opts.app_label, opts.model_name)
+
+    def get_page_number(self, model, using=None):
+        # the last value wins, so pagination buttons override the current page inputs
+        numbers = self.request.POST.getlist(self.get_page_parameter(model, using))
+        return numbers[-1] if numbers else 1
+
+    def get_field_diff(self, search, replace, field, value):
+        """
+        Returns a FieldDiff with snippets of context_size characters around the
+        occurrences in value, so the preview doesn't hold and render complete values.
+        """
+        matches = list(self.get_replacer(search, replace).iter_matches(value))
+        return FieldDiff(
+            field, get_snippets(value, matches, self.context_size), len(matches)
+        )
+
+    def get_preview_page(
+        self, search, replace, model, fields, stats, number=1, using=None
+    ):
+        """
+        Returns a page of at most preview_page_size (PreviewInstance, [FieldDiff, ...])
+        tuples.
+        The total number of matches is counted by the database.
+        """
+        with stats.timer("filter"):
+            qs = self.get_instances(search, model, fields, preview=True, using=using)
+            page = Paginator(qs.order_by("pk"), self.preview_page_size).get_page(number)
+        with stats.timer("iterate"):
+            instances = list(page.object_list)
+        stats.rows_scanned = len(instances)
+        object_list = []
+        with stats.timer("replace"):
+            for instance in instances:
+                changed_fields = self.replace_instance(
+                    search, replace, instance, fields
+                )
+                if changed_fields:
+                    object_list.append(
+                        (
+                            PreviewInstance(instance),
+                            [
+                                self.get_field_diff(search, replace, field, value)
+                                for field, value, _ in changed_fields
+                            ],
+                        )
+                    )
+        stats.rows_changed = len(object_list)
+        page.object_list = object_list
+        page.parameter = self.get_page_parameter(model, using)
+        page.using = using
+        return page
+
+    def apply_search_and_replace(
+        self, search, replace, model, fields, preview, progress=None, using=None
+    ):
+        """
+        Returns a page of (PreviewInstance, changed fields) tuples in preview mode,
+        the number of changed instances otherwise.
+        When applying, progress is called with the number of scanned instances, the number
+        of changed instances and the last scanned primary key after every batch.
+        using is the database alias to search, None for the one chosen by the router.
+        """
+        stats = ModelStats(model, fields, preview, using)
+        if using is None:
+            aliases = {router.db_for_read(model), router.db_for_write(model)}
+        else:
+            aliases = {using}
+        with stats.count_queries(aliases):
+            if preview:
+                get_page = (
+                    self.get_cached_preview_page
+                    if self.cache_previews
+                    and get_versioned_models().issuperset(
+                        self.get_data_models(model, fields)
+                    )
+                    else self.get_preview_page
+                )
+                result = get_page(
+                    search,
+                    replace,
+                    model,
+                    fields,
+                    stats,
+                    self.get_page_number(model, using),
+                    using,
+                )
+            else:
+                result = self.replace_matches(
+                    search, replace, model, fields, stats, progress, using
+                )
+        self.record_stats(stats)
+        return result
+
+    def get_data_models(self, model, fields):
+        """
+        Returns the models whose data is shown in the preview of fields of model.
+        """
+        return [
+            model,
+            *{
+                get_field_path(model, field).field.model
+                for field in fields
+                if get_field_path(model, field).relations
+            },
+        ]
+
+    def get_preview_cache_key_parts(self, model, fields):
+        """
+        Returns a list of further values the cached preview pages of model depend on.
+        Override it when get_query_set depends on the request, e.g. the user or tenant.
+        """
+        return []
+
+    def get_preview_cache_key(self, search, replace, model, fields, number, using=None):
+        """
+        Identifies a preview page of model, including the data version of model.
+        """
+        return "search-replace-page-{}".format(
+            self.get_checksum(
+                [
+                    "{}.{}".format(
+                        self.__class__.__module__, self.__class__.__qualname__
+                    ),
+                    self.get_preview_cache_key_parts(model, fields),
+                    search,
+                    replace,
+                    sorted(self.get_replace_options().items()),
+                    self.get_model_key(model, using),
+                    list(fields),
+                    str(number),
+                    self.preview_page_size,
+                    self.context_size,
+                    [
+                        get_data_version(
+                            data_model, using=using or router.db_for_read(data_model)
+                        )
+                        for data_model in self.get_data_models(model, fields)
+                    ],
+                ]
+            )
+        )
+
+    def get_cached_preview_page(
+        self, search, replace, model, fields, stats, number=1, using=None
+    ):
+        """
+        Returns the preview page from the cache, computes and caches it if the page
+        wasn't cached or the data of model changed since.
+        """
+        with stats.timer("filter"):
+            key = self.get_preview_cache_key(
+                search, replace, model, fields, number, using
+            )
+            data = cache.get(key)
+        if data is not None:
+            return pickle.loads(data)
+        page = self.get_preview_page(
+            search, replace, model, fields, stats, number, using
+        )
+        # the paginator's queryset would be evaluated completely when pickled
+        page.paginator = copy.copy(page.paginator)
+        page.paginator.object_list = ()
+        data = pickle.dumps(page, pickle.HIGHEST_PROTOCOL)
+        if len(data) <= self.preview_cache_max_size:
+            cache.set(key, data, self.preview_cache_timeout)
+        return page
+
+    def replace_matches(
+        self, search, replace, model, fields, stats, progress=None, using=None
+    ):
+        """
+        Replaces search in all matching instances, returns the number of changed instances.
+        """
+        if (
+            self.database_replace
+            and self.get_preview_matches(model, using) is None
+            and self.get_resume_pk(model, using) is None
+            and not self.undo_log
+            and self.get_replacer(search, replace).is_literal
+            and self.can_replace_in_database(model, fields)
+        ):
+            with stats.timer("save"):
+                count = self.replace_in_database(search, replace, model, fields, using)
+            stats.rows_scanned = stats.rows_changed = count
+            if progress is not None:
+                progress(count, count, None)
+            return count
+
+        # every batch is loaded, replaced and written in its own transaction, so locks
+        # are only held for one batch and a failure keeps the batches written before
+        batches = self.iter_changed_batches(
+            search, replace, model, fields, stats, using
+        )
+        while True:
+            with transaction.atomic(using=using or router.db_for_write(model)):
+                item = next(batches, None)
+                if item is None:
+                    break
+                batch, changes = item
+                if changes:
+                    with stats.timer("save"):
+                        self.save_instances(
+                            model,
+                            [
+                                (instance, [field for field, _, _ in changed_fields])
+                                for instance, changed_fields in changes
+                            ],
+                            using,
+                        )
+                        if self.undo_log:
+                            self.log_changes(model, changes, using)
+            stats.rows_changed += len(changes)
+            if progress is not None:
+                progress(len(batch), len(changes), batch[-1].pk)
+            if self.throttle and len(batch) >= self.batch_size:
+                time.sleep(self.throttle)
+        return stats.rows_changed
+
+    def log_changes(self, model, changes, using=None):
+        """
+        Stores the old values and a checksum of the new values of a batch of
+        (instance, changed fields) tuples for the current job using a single bulk insert.
+        """
+        SearchAndReplaceChange.objects.bulk_create(
+            [
+                SearchAndReplaceChange(
+                    job=self.job,
+                    model=model._meta.label_lower,
+                    database=using or "",
+                    object_id=str(instance.pk),
+                    field=field,
+                    old_value=old_value,
+                    new_value_checksum=self.get_checksum([new_value]),
+                )
+                for instance, changed_fields in changes
+                for field, old_value, new_value in changed_fields
+            ]
+        )
+
+    def revert_job(self, job):
+        """
+        Restores the old values logged by job, loading and writing batch_size changes
+        per transaction. Returns the number of restored values.
+        Values changed after the job are kept and counted in skipped_changes.
+        """
+        self.skipped_changes = 0
+        count = 0
+        for label, database in (
+            job.changes.order_by().values_list("model", "database").distinct()
+        ):
+            model = apps.get_model(label)
+            using = database or None
+            batches = self.iter_batches(
+                job.changes.filter(model=label, database=database)
+            )
+            while True:
+                with transaction.atomic(using=using or router.db_for_write(model)):
+                    batch = next(batches, None)
+                    if batch is None:
+                        break
+                    count += self.revert_changes(model, batch, using)
+                if self.throttle and len(batch) >= self.batch_size:
+                    time.sleep(self.throttle)
+        job.reverted = timezone.now()
+        job.save(update_fields=["reverted"])
+        return count
+
+    def revert_changes(self, model, changes, using=None):
+        """
+        Restores a batch of SearchAndReplaceChanges of model, returns the number of
+        restored values. Changes of deleted instances are skipped, as are values that
+        differ from the one written by the job.
+        """
+        fields = {change.field for change in changes}
+        qs = model._base_manager.db_manager(using).filter(
+            pk__in={model._meta.pk.to_python(change.object_id) for change in changes}
+        )
+        relations = {get_field_path(model, field).relation for field in fields}
+        relations.discard(None)
+        if relations:
+            qs = qs.select_related(*relations)
+        instances = qs.in_bulk()
+
+        changed = {}
+        for change in changes:
+            instance = instances.get(model._meta.pk.to_python(change.object_id))
+            if instance is None:
+                continue
+            if change.new_value_checksum and change.new_value_checksum != (
+                self.get_checksum([self.get_value(instance, change.field)])
+            ):
+                # changed since the job
+                self.skipped_changes += 1
+                continue
+            path = get_field_path(model, change.field)
+            if path.set_value(instance, change.old_value) is None:
+                continue
+            changed.setdefault(instance.pk, (instance, []))[1].append(change.field)
+        if changed:
+            self.save_instances(model, list(changed.values()), using)
+        return sum(len(names) for _, names in changed.values())
+
+    def record_stats(self, stats):
+        """
+        Logs the stats of a model and sends the model_processed signal.
+        """
+        logger.info(
+            "Search and replace in %s: %s",
+            stats.model._meta.label,
+            stats,
+            extra={"search_and_replace_stats": stats.as_dict()},
+        )
+        model_processed.send(sender=self.__class__, view=self, stats=stats)
+        if self.show_stats:
+            self.stats.append(stats)
+
+    def get_max_workers(self):
+        """
+        Returns max_workers, at least the number of databases so the aliases are searched
+        and replaced concurrently.
+        """
+        return max(self.max_workers, len(self.databases or ()))
+
+    def map_models(self, fn, items):
+        """
+        Returns [fn(item) for item in items], running up to get_max_workers() calls
+        concurrently. Every worker thread uses its own database connections.
+        """
+        return list(self.iter_models(fn, items))
+
+    def iter_models(self, fn, items):
+        """
+        Like map_models, but yields every result in order as soon as it is available.
+        """
+        items = list(items)
+        max_workers = min(self.get_max_workers(), len(items))
+        if max_workers <= 1:
+            for item in items:
+                yield fn(item)
+            return
+        with ThreadExecutor(
+            max_workers=max_workers, thread_name_prefix="search-and-replace"
+        ) as executor:
+            yield from executor.map(fn, items)
+
+    def get_results(self, search, replace, preview=True, lazy=False):
+        """
+        Returns a list of (model, result) tuples of the models with results, one per
+        database of the model, a generator if lazy is set. The databases are searched
+        concurrently like the models, see max_workers.
+        """
+
+        def apply(target):
+            model, selected_fields, using = target
+            return self.apply_search_and_replace(
+                search, replace, model, selected_fields, preview=preview, using=using
+            )
+
+        targets = self.get_targets()
+        map_models = self.iter_models if lazy else self.map_models
+        results = (
+            (model, result)
+            for (model, _, _), result in zip(targets, map_models(apply, targets))
+            if result
+        )
+        return results if lazy else list(results)
+
+    def get_executor(self):
+        """
+        Returns the executor running background jobs, by default a thread pool in this process.
+        """
+        return self.executor or get_default_executor()
+
+    def create_job(self, search, replace):
+        job = SearchAndReplaceJob(search=search, replace=replace)
+        job.set_replace_options(self.get_replace_options())
+        job.save()
+        SearchAndReplaceJobProgress.objects.bulk_create(
+            [
+                SearchAndReplaceJobProgress(
+                    job=job,
+                    position=position,
+                    model=model._meta.label_lower,
+                    database=using or "",
+                    fields=",".join(fields),
+                )
+                for position, (model, fields, using) in enumerate(self.get_targets())
+            ]
+        )
+        return job
+
+    def run_job(self, job_id):
+        """
+        Applies the replacements of a job, recording the progress per model.
+        """
+        job = self.job = SearchAndReplaceJob.objects.get(pk=job_id)
+        self.replace_options = job.get_replace_options()
+        job.status = job.RUNNING
+        job.started = timezone.now()
+        job.save(update_fields=["status", "started"])
+        try:
+            self.map_models(
+                lambda progress: self.run_job_progress(job, progress),
+                job.progress.all(),
+            )
+        except Exception:
+            logger.exception("Search and replace job %s failed", job.pk)
+            job.status = job.FAILED
+            job.error = traceback.format_exc()
+        else:
+            job.status = job.DONE
+        job.finished = timezone.now()
+        job.save(update_fields=["status", "error", "finished"])
+
+    def run_job_progress(self, job, progress):
+        progress.started = timezone.now()
+        progress.save(update_fields=["started"])
+
+        def update(scanned, changed, last_pk):
+            progress.rows_scanned += scanned
+            progress.rows_changed += changed
+            progress.save(update_fields=["rows_scanned", "rows_changed"])
+
+        self.apply_search_and_replace(
+            job.search,
+            job.replace,
+            apps.get_model(progress.model),
+            progress.get_fields(),
+            preview=False,
+            progress=update,
+            using=progress.database or None,
+        )
+        progress.finished = timezone.now()
+        progress.save(update_fields=["finished"])
+
+    def start_job(self, search, replace):
+        job = self.create_job(search, replace)
+        transaction.on_commit(lambda: self.get_executor().submit(self.run_job, job.pk))
+        return job
 
     def form_valid(self, preview=True):
         search = self.form.cleaned_data["search"]
         replace = self.form.cleaned_data["replace"]
+        self.replace_options = self.form.get_replace_options()
+        self.skipped_instances = 0
+        self.stats = []
+
+        if preview:
+            self.preview_id = str(uuid.uuid4())
+        elif self.reuse_preview_matches:
+            self.preview_matches = self.load_preview_matches(search, replace)
+
+        if not preview and self.background:
+            return self.response_job(self.start_job(search, replace))
+
+        if preview and self.stream_preview:
+            return self.response_streaming_preview(search, replace)
+
+        if not preview and self.undo_log:
+            # changes are logged per job, so the job is run in this request
+            job = self.create_job(search, replace)
+            self.run_job(job.pk)
+            return self.response_logged_job(job)
 
         results = self.get_results(search, replace, preview=preview)
-        num_results = sum(len(instances) for model, instances in results)
 
         if preview:
+            if self.reuse_preview_matches:
+                self.store_preview_matches(search, replace)
+            num_results = sum(page.paginator.count for model, page in results)
             return self.response_preview(search, replace, results, num_results)
         else:
+            num_results = sum(count for model, count in results)
             return self.response_success(search, replace, results, num_results)
 
+    def form_statistics(self):
+        search = self.form.cleaned_data["search"]
+        replace = self.form.cleaned_data["replace"]
+        self.replace_options = self.form.get_replace_options()
+        targets = self.get_targets()
+        counts = self.map_models(
+            lambda target: self.count_matches(search, *target), targets
+        )
+        # the counts of all databases of a model are added up
+        statistics = {}
+        for (model, _, _), count in zip(targets, counts):
+            total = statistics.get(model)
+            statistics[model] = (
+                count if total is None else self.add_counts(total, count)
+            )
+        return self.response_statistics(search, replace, list(statistics.items()))
+
+    def add_counts(self, total, count):
+        """
+        Returns the sum of two results of count_matches for the same fields.
+        """
+        fields = []
+        for (field, rows, occurrences), (_, other_rows, other_occurrences) in zip(
+            total["fields"], count["fields"]
+        ):
+            if occurrences is not None:
+                occurrences += other_occurrences
+            fields.append((field, rows + other_rows, occurrences))
+        return {"rows": total["rows"] + count["rows"], "fields": fields}
+
+    def response_statistics(self, search, replace, statistics):
+        return self.render_to_response(
+            self.get_context_data(
+                statistics=statistics,
+                num_results=sum(count["rows"] for model, count in statistics),
+                search=search,
+                replace=replace,
+                replace_options=self.get_replace_options(),
+            )
+        )
+
     def response_preview(self, search, replace, results, num_results):
         return self.render_to_response(
             self.get_context_data(
@@ -112,10 +1277,60 @@ class SearchAndReplaceView(TemplateView):
                 num_results=num_results,
                 search=search,
                 replace=replace,
-                preview_id=str(uuid.uuid4()),
+                replace_options=self.get_replace_options(),
+                stats=self.stats,
+                preview_id=self.preview_id,
             )
         )
 
+    def response_streaming_preview(self, search, replace):
+        """
+        Streams the page up to the results immediately, then the results of every model as
+        soon as it was searched and finally the rest of the page. The page is cut at the
+        two stream_markers around the results, the results of every model are rendered
+        from the model_results block alone, so blocks can be overridden as usual.
+        """
+        marker = mark_safe("<!-- search-and-replace-{} -->".format(uuid.uuid4()))
+        context = {
+            "search": search,
+            "replace": replace,
+            "replace_options": self.get_replace_options(),
+            "preview_id": self.preview_id,
+            "stream_marker": marker,
+        }
+        template = select_template(self.get_template_names())
+
+        def render(**kwargs):
+            parts = template.render(
+                self.get_context_data(**context, **kwargs), self.request
+            ).split(marker)
+            if len(parts) != 3:
+                raise ImproperlyConfigured(
+                    "{} has to render {{{{ stream_marker }}}} before and after the "
+                    "results to stream the preview.".format(template.template.name)
+                )
+            return parts
+
+        # rendered before the response starts, so a template without markers fails here
+        head = render(results=[])[0]
+
+        def stream():
+            yield head
+            num_results = 0
+            for model, page in self.get_results(search, replace, lazy=True):
+                num_results += page.paginator.count
+                yield render_block(
+                    template,
+                    "model_results",
+                    self.get_context_data(**context, model=model, page=page),
+                    self.request,
+                )
+            if self.reuse_preview_matches:
+                self.store_preview_matches(search, replace)
+            yield render(results=[], num_results=num_results, stats=self.stats)[2]
+
+        return StreamingHttpResponse(stream())
+
     def response_success(self, search, replace, results, num_results):
         messages.success(
             self.request,
@@ -123,4 +1338,105 @@ class SearchAndReplaceView(TemplateView):
                 search, replace, num_results
             ),
         )
+        if self.skipped_instances:
+            messages.warning(
+                self.request,
+                _("Skipped {} instances that changed since the preview").format(
+                    self.skipped_instances
+                ),
+            )
         return HttpResponseRedirect(".")
+
+    def response_logged_job(self, job):
+        job.refresh_from_db()
+        if job.status == job.FAILED:
+            messages.error(
+                self.request,
+                _("Replacing {} with {} failed").format(job.search, job.replace),
+            )
+            return HttpResponseRedirect("?job={}".format(job.pk))
+        return self.response_success(
+            job.search,
+            job.replace,
+            job.progress.all(),
+            sum(progress.rows_changed for progress in job.progress.all()),
+        )
+
+    def response_job(self, job):
+        messages.info(
+            self.request,
+            _("Started replacing {} with {} in the background").format(
+                job.search, job.replace
+            ),
+        )
+        return HttpResponseRedirect("?job={}".format(job.pk))
+
+
+class AsyncSearchAndReplaceView(SearchAndReplaceView):
+    """
+    SearchAndReplaceView for ASGI. Requests are handled in a thread of their own and
+    the models are searched and replaced concurrently, each in a worker thread.
+    """
+
+    # number of models searched and replaced concurrently
+    max_workers = 4
+
+    @classmethod
+    def as_view(cls, **initkwargs):
+        view = super().as_view(**initkwargs)
+        if asyncio.iscoroutinefunction(view):
+            return view
+
+        # Django < 4.1 doesn't detect async handlers of class based views
+        sync_view = view
+
+        async def view(request, *args, **kwargs):
+            response = sync_view(request, *args, **kwargs)
+            # http_method_not_allowed() and options() return plain responses
+            if inspect.isawaitable(response):
+                response = await response
+            return response
+
+        update_wrapper(view, sync_view)
+        return view
+
+    async def run_sync(self, fn, *args, **kwargs):
+        """
+        Calls fn in a worker thread, closing the database connections of that thread after.
+        """
+
+        def call():
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                connections.close_all()
+
+        return await sync_to_async(call, thread_sensitive=False)()
+
+    async def get(self, request, *args, **kwargs):
+        return await self.run_sync(super().get, request, *args, **kwargs)
+
+    async def post(self, request, *args, **kwargs):
+        return await self.run_sync(super().post, request, *args, **kwargs)
+
+    def form_valid(self, preview=True):
+        # ASGI handlers of Django < 4.2 iterate streaming responses in the event loop,
+        # which can't query the database, so the preview is rendered in one pass
+        self.stream_preview = False
+        return super().form_valid(preview)
+
+    def map_models(self, fn, items):
+        return async_to_sync(self.amap_models)(fn, list(items))
+
+    async def amap_models(self, fn, items):
+        """
+        Returns [fn(item) for item in items], running up to get_max_workers() calls
+        concurrently.
+        """
+        semaphore = asyncio.Semaphore(max(self.get_max_workers(), 1))
+
+        async def run(item):
+            async with semaphore:
+                return await self.run_sync(fn, item)
+
+        return await asyncio.gather(*(run(item) for item in items))